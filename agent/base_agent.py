@@ -41,6 +41,22 @@ class BaseAgent:
         for chunk in self.client.ask_ai_stream(messages):
             yield chunk
 
+
+    async def ask_ai_async(self, question: str) -> str:
+        user_message = BaseMessage(content=question, type="user")
+        messages = [self.system_message] + self.hist_messages + [user_message]
+        response = await self.client.ask_ai_async(messages)
+        logger.debug(f"AI Response: {response}")
+        return response
+
+
+    async def ask_ai_stream_async(self, question: str):
+        user_message = BaseMessage(content=question, type="user")
+        messages = [self.system_message] + self.hist_messages + [user_message]
+        logger.debug("AI response streaming...")
+        async for chunk in self.client.ask_ai_stream_async(messages):
+            yield chunk
+
     
     @staticmethod
     def use_stub_client() -> bool:
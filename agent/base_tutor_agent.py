@@ -1,9 +1,10 @@
 
 import textwrap
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 from agent.client.ai_client import AiClient
 from .base_agent import BaseAgent
+from utils import TopKSketch
 
 
 BASE_TUTOR_PROMPT = """
@@ -60,13 +61,16 @@ Then ask an easy question.
 class BaseTutorAgent(BaseAgent):
 
     class TutorSessionState(BaseModel):
+        model_config = ConfigDict(arbitrary_types_allowed=True)
+
         user_uuid: str
         course_id: int
         
         consecutive_errors: int = 0
         last_confidence: float = 1.0
-        weak_grammar: dict[str, int] = {}
-        weak_vocab: dict[str, int] = {}
+        # bounded, decaying tallies of the learner's recurring mistakes
+        weak_grammar: TopKSketch = Field(default_factory=TopKSketch)
+        weak_vocab: TopKSketch = Field(default_factory=TopKSketch)
 
 
     def __init__(self, client: AiClient, instructions: str):
@@ -88,10 +92,17 @@ class BaseTutorAgent(BaseAgent):
             Current mode: {mode}
             Learner confidence: {session.last_confidence}
             Consecutive errors: {session.consecutive_errors}
+            Weak grammar: {BaseTutorAgent._weak_items(session.weak_grammar)}
+            Weak vocabulary: {BaseTutorAgent._weak_items(session.weak_vocab)}
 
             {MODE_PROMPTS[mode]}
 
             {output_instruction}
         """
 
-        return textwrap.dedent(prompt)
\ No newline at end of file
+        return textwrap.dedent(prompt)
+
+
+    @staticmethod
+    def _weak_items(sketch: TopKSketch, count: int = 3) -> str:
+        return ", ".join(item for item, _ in sketch.top(count)) or "none"
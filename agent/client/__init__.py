@@ -1,4 +1,8 @@
 from .ollama_client import OllamaClient
 from .openai_client import OpenAiClient
 from .ai_client import AiClient
-from .stub_client import StubClient
\ No newline at end of file
+from .stub_client import StubClient
+from .caching_client import CachingAiClient
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .retry import DeadlineExceededError
+from .client_registry import LlmClientSettings, init_llm_clients, get_llm_settings, get_circuit_breaker, llm_client_stats, close_llm_clients
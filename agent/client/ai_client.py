@@ -5,4 +5,20 @@ class AiClient:
        raise NotImplementedError("Subclasses must implement ask_ai.")
 
     def ask_ai_stream(self, messages: list[BaseMessage]):
-        raise NotImplementedError("Subclasses must implement ask_ai_stream.")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement ask_ai_stream.")
+
+    def cache_params(self) -> dict:
+        """
+        Settings that change the answer to the same messages, part of the response cache key.
+        """
+        return {"client": type(self).__name__}
+
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        raise NotImplementedError("Subclasses must implement ask_ai_async.")
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        """
+        Async iterator of the response chunks, streams without holding a thread.
+        """
+        raise NotImplementedError("Subclasses must implement ask_ai_stream_async.")
+        yield
@@ -0,0 +1,155 @@
+import os
+import json
+import random
+import hashlib
+import threading
+from langchain.schema import BaseMessage
+
+from utils import get_app_logger
+from .ai_client import AiClient
+from .response_cache import get_response_cache
+
+logger = get_app_logger(__name__)
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+    def to_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+class CachingAiClient(AiClient):
+    """
+    Wraps an AiClient and reuses its answers to identical prompts. The key is a
+    hash of the client's cache_params() (model, temperature) and the messages.
+    Up to variants answers are kept per key: while fewer are cached a request
+    still goes to the LLM and its answer is added, then a random one is served,
+    so learners asking for the same exercise don't all get the same text.
+
+    Defaults come from LLM_CACHE_TTL and LLM_CACHE_VARIANTS, overridden per
+    name with LLM_CACHE_<NAME>_TTL / LLM_CACHE_<NAME>_VARIANTS.
+
+    validate(response) is called before an answer is stored, answers it rejects
+    (raises or returns False) are passed on to the caller but never cached.
+    """
+    _stats: dict[str, ResponseCacheStats] = {}
+    _stats_lock = threading.Lock()
+
+    def __init__(self, client: AiClient, name: str, ttl: float | None = None, variants: int | None = None,
+                 validate=None):
+        self.client = client
+        self.name = name
+        self.validate = validate
+        prefix = f"LLM_CACHE_{name.upper()}"
+        self.ttl = ttl or float(os.getenv(f"{prefix}_TTL", os.getenv("LLM_CACHE_TTL", "86400")))
+        self.variants = variants or int(os.getenv(f"{prefix}_VARIANTS", os.getenv("LLM_CACHE_VARIANTS", "5")))
+        self.cache = get_response_cache()
+        with CachingAiClient._stats_lock:
+            self.stats = CachingAiClient._stats.setdefault(name, ResponseCacheStats())
+
+
+    @staticmethod
+    def stats_by_name() -> dict:
+        return {name: stats.to_dict() for name, stats in CachingAiClient._stats.items()}
+
+
+    def cache_params(self) -> dict:
+        return self.client.cache_params()
+
+
+    def ask_ai(self, messages: list[BaseMessage]) -> str:
+        if self.cache is None:
+            return self.client.ask_ai(messages)
+        key = self._fingerprint(messages)
+        cached = self._pick(self.cache.get(key))
+        if cached is not None:
+            return cached
+        response = self.client.ask_ai(messages)
+        if self._valid(response):
+            self.cache.add(key, response, self.variants, self.ttl)
+        return response
+
+
+    def ask_ai_stream(self, messages: list[BaseMessage]):
+        if self.cache is None:
+            yield from self.client.ask_ai_stream(messages)
+            return
+        key = self._fingerprint(messages)
+        cached = self._pick(self.cache.get(key))
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        for chunk in self.client.ask_ai_stream(messages):
+            chunks.append(chunk)
+            yield chunk
+        # only complete answers are cached
+        response = "".join(chunks)
+        if self._valid(response):
+            self.cache.add(key, response, self.variants, self.ttl)
+
+
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        if self.cache is None:
+            return await self.client.ask_ai_async(messages)
+        key = self._fingerprint(messages)
+        cached = self._pick(await self.cache.get_async(key))
+        if cached is not None:
+            return cached
+        response = await self.client.ask_ai_async(messages)
+        if self._valid(response):
+            await self.cache.add_async(key, response, self.variants, self.ttl)
+        return response
+
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        if self.cache is None:
+            async for chunk in self.client.ask_ai_stream_async(messages):
+                yield chunk
+            return
+        key = self._fingerprint(messages)
+        cached = self._pick(await self.cache.get_async(key))
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        async for chunk in self.client.ask_ai_stream_async(messages):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        if self._valid(response):
+            await self.cache.add_async(key, response, self.variants, self.ttl)
+
+
+    def _valid(self, response: str) -> bool:
+        if self.validate is None:
+            return True
+        try:
+            valid = self.validate(response) is not False
+        except Exception as e:
+            valid = False
+            logger.warning(f"Not caching invalid {self.name} answer: {e}")
+        return valid
+
+
+    def _pick(self, variants: list[str]) -> str | None:
+        hit = len(variants) >= self.variants
+        with CachingAiClient._stats_lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return random.choice(variants) if hit else None
+
+
+    def _fingerprint(self, messages: list[BaseMessage]) -> str:
+        payload = json.dumps({
+            "params": self.client.cache_params(),
+            "messages": [[message.type, message.content] for message in messages],
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,81 @@
+import time
+import threading
+
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a provider is degraded. After failure_threshold
+    consecutive failures the circuit opens and calls raise CircuitOpenError.
+    Once reset_timeout has passed one probe call is let through (half open),
+    its success closes the circuit and its failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == CircuitBreaker.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return CircuitBreaker.HALF_OPEN
+            return self._state
+
+
+    def before_call(self):
+        with self._lock:
+            if self._state == CircuitBreaker.OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit {self.name} is open")
+                self._state = CircuitBreaker.HALF_OPEN
+                self._probing = False
+            if self._state == CircuitBreaker.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit {self.name} is half open, probe in flight")
+                self._probing = True
+
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CircuitBreaker.CLOSED:
+                logger.info(f"circuit {self.name} closed")
+            self._state = CircuitBreaker.CLOSED
+            self._failures = 0
+            self._probing = False
+
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == CircuitBreaker.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != CircuitBreaker.OPEN:
+                    logger.warning(f"circuit {self.name} opened after {self._failures} failures")
+                self._state = CircuitBreaker.OPEN
+                self._opened_at = self.clock()
+                self._probing = False
+
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self._failures, "rejected": self.rejected}
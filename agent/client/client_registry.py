@@ -0,0 +1,131 @@
+import os
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from pydantic import BaseModel
+
+from utils import get_app_logger
+from .circuit_breaker import CircuitBreaker
+
+logger = get_app_logger(__name__)
+
+
+class LlmClientSettings(BaseModel):
+    api_key: str | None = None
+    base_url: str | None = None             # any OpenAI-compatible endpoint, None for api.openai.com
+    model: str = "gpt-4.1-mini"
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0              # between two bytes of the response, i.e. stream chunks
+    deadline: float = 120.0                 # wall clock of the whole call including retries and streaming
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    http2: bool = True
+    max_retries: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+    breaker_failures: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "LlmClientSettings":
+        defaults = cls()
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY") or None,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            model=os.getenv("OPENAI_MODEL", defaults.model),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            read_timeout=float(os.getenv("LLM_READ_TIMEOUT", defaults.read_timeout)),
+            deadline=float(os.getenv("LLM_DEADLINE", defaults.deadline)),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", defaults.max_connections)),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections)),
+            http2=os.getenv("LLM_HTTP2", str(defaults.http2)).lower() == "true",
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", defaults.max_retries)),
+            retry_base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", defaults.retry_base_delay)),
+            retry_max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", defaults.retry_max_delay)),
+            breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", defaults.breaker_failures)),
+            breaker_reset_timeout=float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", defaults.breaker_reset_timeout)),
+        )
+
+
+    def timeout(self, remaining: float | None = None) -> httpx.Timeout:
+        # per socket operation, the wall-clock deadline is enforced by retry.call_with_retry
+        if remaining is None:
+            return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        return httpx.Timeout(max(0.1, min(self.read_timeout, remaining)), connect=max(0.1, min(self.connect_timeout, remaining)))
+
+
+_settings: LlmClientSettings | None = None
+_client: OpenAI | None = None
+_async_client: AsyncOpenAI | None = None
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def init_llm_clients(settings: LlmClientSettings):
+    """
+    Process-wide OpenAI clients on keep-alive connection pools, shared by every
+    agent. Retries are done by OpenAiClient, the SDK's own are disabled.
+    """
+    global _settings, _client, _async_client
+    _settings = settings
+    _client = _async_client = None
+    _breakers.clear()
+
+
+def get_llm_settings() -> LlmClientSettings:
+    if _settings is None:
+        init_llm_clients(LlmClientSettings.from_env())
+    return _settings
+
+
+def get_openai_client() -> OpenAI:
+    global _client
+    settings = get_llm_settings()
+    if _client is None:
+        http_client = httpx.Client(http2=_use_http2(settings), limits=_limits(settings), timeout=settings.timeout())
+        _client = OpenAI(api_key=settings.api_key, base_url=settings.base_url, max_retries=0, http_client=http_client)
+        logger.info(f"openai client for {settings.base_url or 'api.openai.com'}, max {settings.max_connections} connections")
+    return _client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    global _async_client
+    settings = get_llm_settings()
+    if _async_client is None:
+        http_client = httpx.AsyncClient(http2=_use_http2(settings), limits=_limits(settings), timeout=settings.timeout())
+        _async_client = AsyncOpenAI(api_key=settings.api_key, base_url=settings.base_url, max_retries=0, http_client=http_client)
+    return _async_client
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        settings = get_llm_settings()
+        breaker = _breakers.setdefault(name, CircuitBreaker(name, settings.breaker_failures, settings.breaker_reset_timeout))
+    return breaker
+
+
+def llm_client_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+async def close_llm_clients():
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+    if _client is not None:
+        _client.close()
+    _client = _async_client = None
+
+
+def _limits(settings: LlmClientSettings) -> httpx.Limits:
+    return httpx.Limits(max_connections=settings.max_connections, max_keepalive_connections=settings.max_keepalive_connections)
+
+
+def _use_http2(settings: LlmClientSettings) -> bool:
+    if not settings.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("h2 is not installed, LLM connections use HTTP/1.1 keep-alive")
+        return False
@@ -9,12 +9,23 @@ class OllamaClient(AiClient):
         temperature=0.7,
     )
 
+    def cache_params(self) -> dict:
+        return {"client": "ollama", "model": OllamaClient.__llm.model, "temperature": OllamaClient.__llm.temperature}
+
     def ask_ai(self, messages: list[BaseMessage]) -> str:
         response = OllamaClient.__llm.invoke(messages)
         return response.content
     
     def ask_ai_stream(self, messages: list[BaseMessage]):
-        response_stream = OllamaClient.__llm.invoke_stream(messages)
+        response_stream = OllamaClient.__llm.stream(messages)
         for chunk in response_stream:
             yield chunk.content
 
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        response = await OllamaClient.__llm.ainvoke(messages)
+        return response.content
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        async for chunk in OllamaClient.__llm.astream(messages):
+            yield chunk.content
+
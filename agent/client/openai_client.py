@@ -1,22 +1,36 @@
-import os
+import time
 from langchain.schema import BaseMessage
-import openai
+from openai.types.chat import ChatCompletion
 
 from utils import get_app_logger
 from .ai_client import AiClient
+from .client_registry import get_llm_settings, get_openai_client, get_async_openai_client, get_circuit_breaker
+from .retry import call_with_retry, call_with_retry_async, is_retryable, iterate_until, iterate_until_async, DeadlineExceededError
 
 logger = get_app_logger(__name__)
 
 class OpenAiClient(AiClient):
+    """
+    Calls go through the shared clients of client_registry, with per-call
+    timeouts, retries and the "openai" circuit breaker. A stream is retried
+    until its first chunk only, later errors reach the caller. Every call,
+    streams included, is abandoned once LLM_DEADLINE has passed.
+    """
+    BREAKER = "openai"
+    TEMPERATURE = 0.7
+
     def __init__(self):
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
+        self.settings = get_llm_settings()
+        if not self.settings.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
+        self.breaker = get_circuit_breaker(OpenAiClient.BREAKER)
 
 
     def ask_ai(self, messages: list[BaseMessage]) -> str:
         request = self._create_request(messages, stream=False)
-        response = openai.chat.completions.create(**request)
+        deadline = time.monotonic() + self.settings.deadline
+        response = call_with_retry(lambda timeout: self._complete(request, timeout, deadline),
+                                   self.breaker, self.settings, deadline)
 
         response_content = response.choices[0].message.content
         logger.debug(f"(OpenAI) RECV: {response_content}")
@@ -25,22 +39,76 @@ class OpenAiClient(AiClient):
 
     def ask_ai_stream(self, messages: list[BaseMessage]):
         request = self._create_request(messages, stream=True)
-        response = openai.chat.completions.create(**request)
+        deadline = time.monotonic() + self.settings.deadline
+        response = call_with_retry(lambda timeout: get_openai_client().chat.completions.create(**request, timeout=timeout),
+                                   self.breaker, self.settings, deadline)
 
         full_text = []
 
-        for chunk in response:
-            content = chunk.choices[0].delta.content
-            if content:
-                full_text.append(content)
-                yield content 
+        try:
+            for chunk in iterate_until(response, deadline):
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    full_text.append(content)
+                    yield content
+        except Exception as e:
+            self._on_stream_error(e)
+            raise
+        finally:
+            response.close()
 
         logger.debug(f"(OpenAI) RECV (streamed): {''.join(full_text)}")
 
-        # for chunk in response:
-        #     content = chunk.choices[0].delta.content
-        #     if content:
-        #         yield content
+
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        request = self._create_request(messages, stream=False)
+        response = await call_with_retry_async(lambda timeout: get_async_openai_client().chat.completions.create(**request, timeout=timeout),
+                                               self.breaker, self.settings)
+
+        response_content = response.choices[0].message.content
+        logger.debug(f"(OpenAI) RECV: {response_content}")
+        return response_content
+
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        request = self._create_request(messages, stream=True)
+        deadline = time.monotonic() + self.settings.deadline
+        response = await call_with_retry_async(lambda timeout: get_async_openai_client().chat.completions.create(**request, timeout=timeout),
+                                               self.breaker, self.settings, deadline)
+
+        full_text = []
+
+        try:
+            async for chunk in iterate_until_async(response, deadline):
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    full_text.append(content)
+                    yield content
+        except Exception as e:
+            self._on_stream_error(e)
+            raise
+        finally:
+            await response.close()
+
+        logger.debug(f"(OpenAI) RECV (streamed): {''.join(full_text)}")
+
+
+    def cache_params(self) -> dict:
+        return {"client": "openai", "base_url": self.settings.base_url, "model": self.settings.model,
+                "temperature": OpenAiClient.TEMPERATURE}
+
+
+    def _complete(self, request: dict, timeout, deadline: float) -> ChatCompletion:
+        # the body is read in chunks, so an answer trickling in can't outlast the deadline
+        with get_openai_client().chat.completions.with_streaming_response.create(**request, timeout=timeout) as response:
+            body = b"".join(iterate_until(response.iter_bytes(), deadline))
+        return ChatCompletion.model_validate_json(body)
+
+
+    def _on_stream_error(self, error: Exception):
+        if is_retryable(error) or isinstance(error, DeadlineExceededError):
+            self.breaker.record_failure()
+        logger.error(f"(OpenAI) stream failed: {error}")
 
 
     def _create_request(self, messages: list[BaseMessage], stream: bool = False) -> dict:
@@ -51,8 +119,8 @@ class OpenAiClient(AiClient):
         ]
         logger.debug(f"Sending messages to OpenAI: {openai_messages}")  
         return {
-            "model": "gpt-4.1-mini",
+            "model": self.settings.model,
             "messages": openai_messages,
-            "temperature": 0.7,
+            "temperature": OpenAiClient.TEMPERATURE,
             "stream": stream,
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from utils import get_app_logger, get_redis, get_async_redis
+
+logger = get_app_logger(__name__)
+
+
+class MemoryResponseCache:
+    """
+    Variants per prompt fingerprint in this process, LRU bounded by max_size.
+    """
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[list[str], float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key: str) -> list[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return []
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return []
+            self._entries.move_to_end(key)
+            return list(entry[0])
+
+
+    def add(self, key: str, response: str, max_variants: int, ttl: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            # an expired entry starts over instead of extending its stale variants
+            variants = entry[0] if entry is not None and entry[1] > time.monotonic() else []
+            if len(variants) < max_variants:
+                self._entries[key] = (variants + [response], time.monotonic() + ttl)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    async def get_async(self, key: str) -> list[str]:
+        return self.get(key)
+
+
+    async def add_async(self, key: str, response: str, max_variants: int, ttl: float):
+        self.add(key, response, max_variants, ttl)
+
+
+class RedisResponseCache:
+    """
+    Variants as a Redis list under llm_cache:<fingerprint>, shared by all workers.
+    """
+    KEY_PREFIX = "llm_cache"
+
+    def get(self, key: str) -> list[str]:
+        return [value.decode() for value in get_redis().lrange(self._key(key), 0, -1)]
+
+
+    def add(self, key: str, response: str, max_variants: int, ttl: float):
+        with get_redis().pipeline(transaction=True) as pipe:
+            RedisResponseCache._queue_add(pipe, self._key(key), response, max_variants, ttl)
+            pipe.execute()
+
+
+    async def get_async(self, key: str) -> list[str]:
+        return [value.decode() for value in await get_async_redis().lrange(self._key(key), 0, -1)]
+
+
+    async def add_async(self, key: str, response: str, max_variants: int, ttl: float):
+        async with get_async_redis().pipeline(transaction=True) as pipe:
+            RedisResponseCache._queue_add(pipe, self._key(key), response, max_variants, ttl)
+            await pipe.execute()
+
+
+    @staticmethod
+    def _queue_add(pipe, key: str, response: str, max_variants: int, ttl: float):
+        # workers that missed together may all push, the list is cut back to max_variants
+        pipe.rpush(key, response)
+        pipe.ltrim(key, 0, max_variants - 1)
+        pipe.expire(key, int(ttl))
+
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"{RedisResponseCache.KEY_PREFIX}:{key}"
+
+
+class DiskResponseCache:
+    """
+    One JSON file per fingerprint in directory, survives restarts of
+    single-host deployments.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+
+    def get(self, key: str) -> list[str]:
+        entry = self._read(key)
+        return entry["variants"] if entry else []
+
+
+    def add(self, key: str, response: str, max_variants: int, ttl: float):
+        with self._lock:
+            entry = self._read(key) or {"variants": []}
+            if len(entry["variants"]) >= max_variants:
+                return
+            entry["variants"].append(response)
+            entry["expires_at"] = time.time() + ttl
+            path = self._path(key)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+
+
+    async def get_async(self, key: str) -> list[str]:
+        return self.get(key)
+
+
+    async def add_async(self, key: str, response: str, max_variants: int, ttl: float):
+        self.add(key, response, max_variants, ttl)
+
+
+    def _read(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring corrupt LLM cache entry {key}: {e}")
+            return None
+        return entry if entry["expires_at"] > time.time() else None
+
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+
+_cache = None
+
+
+def get_response_cache():
+    """
+    Process-wide response cache selected by LLM_CACHE_BACKEND: memory, redis,
+    disk (files in LLM_CACHE_DIR) or none.
+    """
+    global _cache
+    if _cache is None:
+        backend = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+        if backend == "memory":
+            _cache = MemoryResponseCache(int(os.getenv("LLM_CACHE_MAX_SIZE", "1000")))
+        elif backend == "redis":
+            _cache = RedisResponseCache()
+        elif backend == "disk":
+            _cache = DiskResponseCache(os.getenv("LLM_CACHE_DIR", ".llm_cache"))
+        elif backend == "none":
+            _cache = False
+        else:
+            raise ValueError(f"Invalid LLM_CACHE_BACKEND {backend}")
+        logger.info(f"LLM response cache: {backend}")
+    return _cache or None
@@ -0,0 +1,123 @@
+import time
+import random
+import asyncio
+import openai
+
+from utils import get_app_logger
+from .circuit_breaker import CircuitBreaker
+from .client_registry import LlmClientSettings
+
+logger = get_app_logger(__name__)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Rate limits, 5xx answers, timeouts and connection errors are worth another try.
+    """
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def backoff_delay(settings: LlmClientSettings, attempt: int) -> float:
+    # full jitter, spreads the retries of concurrent callers
+    return random.uniform(0, min(settings.retry_max_delay, settings.retry_base_delay * 2 ** attempt))
+
+
+class DeadlineExceededError(TimeoutError):
+    pass
+
+
+def call_with_retry(call, breaker: CircuitBreaker, settings: LlmClientSettings, deadline: float | None = None):
+    """
+    Returns call(timeout), retrying retryable errors with jittered exponential
+    backoff until max_retries or the deadline (time.monotonic(), default
+    settings.deadline from now) is reached. The breaker counts one failure per
+    call whose retries are exhausted, not one per attempt.
+    """
+    deadline = deadline or time.monotonic() + settings.deadline
+    breaker.before_call()
+    attempt = 0
+    while True:
+        try:
+            result = call(settings.timeout(_remaining(deadline)))
+        except Exception as e:
+            time.sleep(_on_error(e, breaker, settings, attempt, deadline))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def call_with_retry_async(call, breaker: CircuitBreaker, settings: LlmClientSettings, deadline: float | None = None):
+    """
+    call_with_retry for coroutine calls, backs off without blocking the event
+    loop. Each attempt is cancelled when the deadline passes, however slowly
+    the response trickles in.
+    """
+    deadline = deadline or time.monotonic() + settings.deadline
+    breaker.before_call()
+    attempt = 0
+    while True:
+        try:
+            remaining = _remaining(deadline)
+            try:
+                result = await asyncio.wait_for(call(settings.timeout(remaining)), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(f"LLM call exceeded its {settings.deadline}s deadline")
+        except Exception as e:
+            await asyncio.sleep(_on_error(e, breaker, settings, attempt, deadline))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+def iterate_until(chunks, deadline: float):
+    """
+    Passes chunks on until the deadline, a stalled chunk is bounded by the read timeout.
+    """
+    for chunk in chunks:
+        _remaining(deadline)
+        yield chunk
+
+
+async def iterate_until_async(chunks, deadline: float):
+    iterator = chunks.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), _remaining(deadline))
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError("LLM stream exceeded its deadline")
+        yield chunk
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("LLM call exceeded its deadline")
+    return remaining
+
+
+def _on_error(error: Exception, breaker: CircuitBreaker, settings: LlmClientSettings, attempt: int, deadline: float) -> float:
+    """
+    Delay before the next attempt, re-raises error when there is none.
+    """
+    if isinstance(error, DeadlineExceededError):
+        breaker.record_failure()
+        raise error
+    if not is_retryable(error):
+        # the provider answered, it is not degraded
+        breaker.record_success()
+        raise error
+
+    delay = backoff_delay(settings, attempt)
+    if attempt >= settings.max_retries or time.monotonic() + delay >= deadline:
+        breaker.record_failure()
+        raise error
+    logger.warning(f"LLM call failed ({error.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+    return delay
@@ -210,7 +210,10 @@ AUDI_EXAMPLE_1 = """
 {"question":
  [{"lang":"en","text":"What is the meaning of"},{"lang":"es","text":"aqua"},{"lang":"en","text":"?"}],
 "answer":
- [{"lang":"en","text":"The meaning of"},{"lang":"es","text":"agua"},{"lang":"en","text":"is water."}]
+ [{"lang":"en","text":"The meaning of"},{"lang":"es","text":"agua"},{"lang":"en","text":"is water."}],
+"weak_grammar": [],
+"weak_vocab": ["agua"],
+"confidence": 0.6
 }
 """
 
@@ -368,6 +371,15 @@ class StubClient(AiClient):
         yield "\n"
 
 
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        return self.ask_ai(messages)
+
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        for chunk in self.ask_ai_stream(messages):
+            yield chunk
+
+
     def _print_messages(self, messages: list[BaseMessage]):
         logger.debug("StubClient received messages:")
         for msg in messages:
@@ -3,6 +3,7 @@ import textwrap
 from .base_agent import BaseAgent
 from .client.openai_client import OpenAiClient
 from .client.stub_client import StubClient
+from .client.caching_client import CachingAiClient
 
 
 SYSTEM_PROMPT = """
@@ -21,8 +22,12 @@ Output must be valid JSON.
 
 
 class ListeningGeneratorAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, validate=None, cached: bool = True):
+        # the prompt only depends on topic, level and languages, answers are shared between learners,
+        # validate keeps answers the caller can't parse out of the cache
         client = StubClient() if BaseAgent.use_stub_client() else OpenAiClient()
+        if cached:
+            client = CachingAiClient(client, name="listening", validate=validate)
         super().__init__(client=client, instructions=SYSTEM_PROMPT)
  
 
@@ -20,7 +20,9 @@ both $lang1 and $lang2. You will then answer the question.
 
 OUTPUT_INSTRUCTIONS=Template(
 """Your response must be in JSON. An example is as follows:
-{"question":$question,"answer":$answer}
+{"question":$question,"answer":$answer,"weak_grammar":[],"weak_vocab":[],"confidence":<0 to 1>}
+weak_grammar and weak_vocab list the grammar points and $lang2 words the learner got wrong in this question,
+leave them empty unless the learner actually made a mistake. confidence is how sure the learner sounds.
 """)
 
 SPANISH_QUESTION_EXAMPLE="""
@@ -49,7 +51,7 @@ class VoiceTutorAgent(BaseTutorAgent):
         task_desc = TASK_DESCRIPTION.substitute(desc=tutor.description, lang1=inst_lang.name,
             lang2=subject.name, lang_code_1=inst_lang.code, lang_code_2=subject.code, level_name=level.name)
         
-        output_instr = OUTPUT_INSTRUCTIONS.substitute(question=question_example, answer=answer_example)
+        output_instr = OUTPUT_INSTRUCTIONS.substitute(question=question_example, answer=answer_example, lang2=subject.name)
 
         system_message = BaseTutorAgent.build_prompt(
             task_description=task_desc,
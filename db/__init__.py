@@ -1 +1,4 @@
-from .database import init_db, start_db, get_session
+from .database import init_db, init_async_db, start_db, stop_db, get_session, get_async_session, get_pool_stats
+from .database import get_read_session, get_async_read_session
+from .engine_factory import DatabaseSettings
+from .routing import RoutingSession, use_primary, read_your_writes
@@ -1,20 +1,81 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
 
+from .engine_factory import DatabaseSettings, create_db_engine, create_async_db_engine, pool_stats
+from .routing import RoutingSession, read_your_writes
+
 engine = None
+async_engine = None
+replica_engine = None
+async_replica_engine = None
 
-def init_db(database_url: str):
-    global engine
-    engine = create_engine(database_url, echo=True)
+def init_db(settings: DatabaseSettings):
+    global engine, replica_engine
+    engine = create_db_engine(settings)
+    if settings.replica_url:
+        replica_engine = create_db_engine(settings, settings.replica_url)
+    read_your_writes.window_seconds = settings.read_your_writes_seconds
     return engine
 
 
+def init_async_db(settings: DatabaseSettings):
+    global async_engine, async_replica_engine
+    async_engine = create_async_db_engine(settings)
+    if settings.replica_url:
+        async_replica_engine = create_async_db_engine(settings, settings.replica_url)
+    return async_engine
+
+
 def start_db(engine):
     SQLModel.metadata.create_all(engine)
 
 
+async def stop_db():
+    global engine, async_engine, replica_engine, async_replica_engine
+    for async_eng in (async_engine, async_replica_engine):
+        if async_eng is not None:
+            await async_eng.dispose()
+    for eng in (engine, replica_engine):
+        if eng is not None:
+            eng.dispose()
+    engine = async_engine = replica_engine = async_replica_engine = None
+
+
+def get_pool_stats() -> dict:
+    stats = {}
+    for name, eng in (("primary", engine), ("primary_async", async_engine),
+                      ("replica", replica_engine), ("replica_async", async_replica_engine)):
+        if eng is not None:
+            stats[name] = pool_stats(eng)
+    return stats
+
+
 def get_session():
     global engine
     with Session(engine) as session:
         yield session
 
+
+def get_read_session():
+    """
+    Session for read-only requests. SELECTs go to the replica when one is configured,
+    anything that writes falls back to the primary.
+    """
+    global engine, replica_engine
+    with RoutingSession(engine, info={"replica": replica_engine}) as session:
+        yield session
+
+
+async def get_async_session():
+    global async_engine
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session():
+    global async_engine, async_replica_engine
+    replica = async_replica_engine.sync_engine if async_replica_engine is not None else None
+    async with AsyncSession(async_engine, expire_on_commit=False, sync_session_class=RoutingSession,
+                            info={"replica": replica}) as session:
+        yield session
@@ -0,0 +1,176 @@
+import os
+import time
+import threading
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlmodel import create_engine
+
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+# sync driver -> asyncio driver used for the async engine
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class DatabaseSettings(BaseModel):
+    database_url: str = "mysql+mysqlconnector://localhost:3306/lingoDB"
+    replica_url: str | None = None      # optional read replica
+    read_your_writes_seconds: float = 5.0
+    echo: bool = False
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30.0          # seconds to wait for a free connection
+    pool_recycle: int = 1800            # seconds, keep below MySQL wait_timeout
+    pool_pre_ping: bool = True
+    statement_timeout_ms: int = 0       # 0 disables the per-session limit
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        defaults = cls()
+        return cls(
+            database_url=os.getenv("DATABASE_URL", defaults.database_url),
+            replica_url=os.getenv("DATABASE_REPLICA_URL") or None,
+            read_your_writes_seconds=float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", defaults.read_your_writes_seconds)),
+            echo=os.getenv("DB_ECHO", str(defaults.echo)).lower() == "true",
+            pool_size=int(os.getenv("DB_POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", defaults.pool_recycle)),
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", str(defaults.pool_pre_ping)).lower() == "true",
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", defaults.statement_timeout_ms)),
+        )
+
+
+class PoolMetrics:
+    """
+    Checkout counters for one connection pool. Wait time is the time a caller
+    spent inside the pool getting a connection, including waiting for a free one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+
+    def record_checkout(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.last_wait = wait
+
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "last_wait_ms": round(self.last_wait * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+
+def _timed_pool_class(base: type) -> type:
+    # a class per engine so Pool.recreate() (used by dispose) keeps the same metrics
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"metrics": PoolMetrics()})
+
+
+def _engine_kwargs(settings: DatabaseSettings, url: str, pool_base: type) -> dict:
+    kwargs = {"echo": settings.echo}
+    if make_url(url).database in (None, "", ":memory:"):
+        # in-memory SQLite lives in a single connection, keep SQLAlchemy's default pool
+        return kwargs
+
+    kwargs.update(
+        poolclass=_timed_pool_class(pool_base),
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+    return kwargs
+
+
+def _set_statement_timeout(engine: Engine, settings: DatabaseSettings):
+    if settings.statement_timeout_ms <= 0:
+        return
+    if engine.dialect.name != "mysql":
+        logger.info(f"statement timeout is not supported for {engine.dialect.name}, ignored")
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET SESSION MAX_EXECUTION_TIME={int(settings.statement_timeout_ms)}")
+        cursor.close()
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def create_db_engine(settings: DatabaseSettings, database_url: str = None) -> Engine:
+    url = database_url or settings.database_url
+    engine = create_engine(url, **_engine_kwargs(settings, url, QueuePool))
+    _set_statement_timeout(engine, settings)
+    return engine
+
+
+def create_async_db_engine(settings: DatabaseSettings, database_url: str = None) -> AsyncEngine:
+    url = to_async_url(database_url or settings.database_url)
+    engine = create_async_engine(url, **_engine_kwargs(settings, url, AsyncAdaptedQueuePool))
+    _set_statement_timeout(engine.sync_engine, settings)
+    return engine
+
+
+def pool_stats(engine: Engine | AsyncEngine) -> dict:
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
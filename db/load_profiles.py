@@ -0,0 +1,131 @@
+from sqlalchemy.orm import selectinload, joinedload
+from datetime import datetime
+from sqlmodel import select, and_, or_
+
+from entity import User, UserCourse, UserTopic, ExerciseSet, ExerciseResult, Course, LessonContent
+
+# Named loader options for User queries. Relationships stay lazy by default,
+# a query asks for what it is going to touch.
+LOAD_PROFILES = {
+    # user.courses and each uc.course in one extra SELECT
+    "user_courses": (selectinload(User.courses).joinedload(UserCourse.course),),
+    "user_devices": (selectinload(User.devices),),
+}
+
+
+def load_profile(name: str | None) -> tuple:
+    if name is None:
+        return ()
+    if name not in LOAD_PROFILES:
+        raise ValueError(f"Unknown load profile {name}")
+    return LOAD_PROFILES[name]
+
+
+def user_courses_statement(user_uuid: str):
+    """
+    (UserCourse, Course) rows of a user, one SELECT.
+    """
+    return (
+        select(UserCourse, Course)
+        .join(User, User.id == UserCourse.user_id)
+        .join(Course, Course.id == UserCourse.course_id)
+        .where(User.uuid == user_uuid)
+    )
+
+
+def course_context_statement(user_uuid: str, course_id: int):
+    """
+    (User, UserCourse, Course) of one enrolled course, one SELECT. The reference
+    rows the lesson needs come from the in-memory Catalog.
+    """
+    return (
+        select(User, UserCourse, Course)
+        .join(UserCourse, UserCourse.user_id == User.id)
+        .join(Course, Course.id == UserCourse.course_id)
+        .where(User.uuid == user_uuid, UserCourse.course_id == course_id)
+    )
+
+
+def user_progress_statement(user_uuid: str):
+    """
+    UserTopic rollups of a user ordered by course and topic, one SELECT.
+    """
+    return (
+        select(UserTopic)
+        .join(User, User.id == UserTopic.user_id)
+        .where(User.uuid == user_uuid, UserTopic.is_active == True)
+        .order_by(UserTopic.course_id, UserTopic.topic_id)
+    )
+
+
+def exercise_history_statement(user_uuid: str, limit: int, course_id: int | None = None, topic_id: int | None = None,
+                               exercise_type: str | None = None, before: tuple[datetime, int] | None = None):
+    """
+    One page of a user's exercise sets, newest first. Pages by (create_date, id)
+    instead of OFFSET so a page costs the same at any depth.
+    """
+    stmt = (
+        select(ExerciseSet)
+        .join(User, User.id == ExerciseSet.user_id)
+        .where(User.uuid == user_uuid)
+    )
+    if course_id is not None:
+        stmt = stmt.where(ExerciseSet.course_id == course_id)
+    if topic_id is not None:
+        stmt = stmt.where(ExerciseSet.topic_id == topic_id)
+    if exercise_type is not None:
+        stmt = stmt.where(ExerciseSet.exercise_type == exercise_type)
+    if before is not None:
+        create_date, set_id = before
+        stmt = stmt.where(or_(
+            ExerciseSet.create_date < create_date,
+            and_(ExerciseSet.create_date == create_date, ExerciseSet.id < set_id)
+        ))
+    return stmt.order_by(ExerciseSet.create_date.desc(), ExerciseSet.id.desc()).limit(limit)
+
+
+def exercise_results_statement(exercise_set_ids: list[int]):
+    """
+    Answers of a page of exercise sets, one SELECT.
+    """
+    return (
+        select(ExerciseResult)
+        .where(ExerciseResult.exercise_set_id.in_(exercise_set_ids))
+        .order_by(ExerciseResult.exercise_set_id, ExerciseResult.id)
+    )
+
+
+def reusable_lessons_statement(user_id: int, subject_id: int, subject_level_id: int, instruction_language_id: int,
+                               topic_id: int, exercise_count: int, limit: int):
+    """
+    Least used stored lessons of a (subject, level, instruction language, topic)
+    the user hasn't been served yet, one SELECT.
+    """
+    served = (
+        select(ExerciseSet.id)
+        .where(ExerciseSet.user_id == user_id, ExerciseSet.lesson_content_id == LessonContent.id)
+    )
+    return (
+        select(LessonContent)
+        .where(
+            LessonContent.subject_id == subject_id,
+            LessonContent.subject_level_id == subject_level_id,
+            LessonContent.instruction_language_id == instruction_language_id,
+            LessonContent.topic_id == topic_id,
+            LessonContent.exercise_count == exercise_count,
+            ~served.exists()
+        )
+        .order_by(LessonContent.use_count, LessonContent.id)
+        .limit(limit)
+    )
+
+
+def exercise_set_content_statement(user_id: int, exercise_set_id: int):
+    """
+    (ExerciseSet, LessonContent | None) of one of the user's exercise sets, one SELECT.
+    """
+    return (
+        select(ExerciseSet, LessonContent)
+        .outerjoin(LessonContent, LessonContent.id == ExerciseSet.lesson_content_id)
+        .where(ExerciseSet.id == exercise_set_id, ExerciseSet.user_id == user_id)
+    )
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements: list[str] = []
+
+
+# the counter object is shared with threadpool and greenlet copies of the context
+_current_counter: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+_installed = False
+
+# path -> statements issued by the last request, for tests
+last_counts: dict[str, int] = {}
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+def install_query_counter():
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+        _installed = True
+
+
+@contextmanager
+def count_queries():
+    install_query_counter()
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def query_budget(max_statements: int):
+    """
+    Declares how many SQL statements an endpoint may issue, checked by
+    QueryBudgetMiddleware when it is installed (test mode).
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_statements
+        return endpoint
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the statements of each request, including those issued while a
+    streaming body is sent, and raises when an endpoint exceeds its query_budget.
+    """
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            await self.app(scope, receive, send)
+
+        path = scope["path"]
+        last_counts[path] = counter.count
+        budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+        logger.debug(f"{scope['method']} {path} issued {counter.count} SQL statements")
+        if budget is not None and counter.count > budget:
+            statements = "\n".join(counter.statements)
+            raise AssertionError(f"{path} issued {counter.count} SQL statements, budget is {budget}:\n{statements}")
@@ -0,0 +1,60 @@
+import time
+import threading
+from sqlalchemy import Select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to the replica engine stored in info["replica"].
+    Flushes, DML and SELECT ... FOR UPDATE go to the primary bind, and the session
+    stays on the primary after its first write so it reads back its own changes.
+    """
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self.info.get("primary_only"):
+            if not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None:
+                return replica
+            if self._flushing or clause is not None:
+                self.info["primary_only"] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def use_primary(session: Session | AsyncSession):
+    # AsyncSession.info proxies the info dict of its sync session
+    session.info["primary_only"] = True
+
+
+class ReadYourWrites:
+    """
+    Remembers users who wrote recently so their reads skip the replica until it
+    has caught up. The window is per process; keep it above the replica lag.
+    """
+    def __init__(self, window_seconds: float = 5.0):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._writes: dict[str, float] = {}
+
+
+    def record_write(self, user_uuid: str):
+        now = time.monotonic()
+        with self._lock:
+            self._writes[user_uuid] = now
+            if len(self._writes) > 10000:
+                self._prune(now)
+
+
+    def recently_wrote(self, user_uuid: str) -> bool:
+        with self._lock:
+            written = self._writes.get(user_uuid)
+        return written is not None and time.monotonic() - written < self.window_seconds
+
+
+    def _prune(self, now: float):
+        expired = [uuid for uuid, written in self._writes.items() if now - written >= self.window_seconds]
+        for uuid in expired:
+            del self._writes[uuid]
+
+
+read_your_writes = ReadYourWrites()
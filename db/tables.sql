@@ -42,6 +42,7 @@ INSERT INTO subject VALUES(9,'pt',1,'Portuguese','The study of the Portuguese la
 CREATE TABLE subject_translation (
 	id INT AUTO_INCREMENT PRIMARY KEY,
 	subject_id INT,
+	language_code VARCHAR(10),
 	name VARCHAR(30),
 	description VARCHAR(128),
 	FOREIGN KEY (subject_id) REFERENCES subject(id)
@@ -100,8 +101,11 @@ CREATE TABLE user_topic (
     topic_id INTEGER,
     name VARCHAR(128),
     is_active BOOLEAN DEFAULT TRUE,
+    set_count INTEGER DEFAULT 0,
     exercise_count INTEGER DEFAULT 0,
+    score_total INTEGER DEFAULT 0,
     correct_percentage REAL DEFAULT 0.0,
+    UNIQUE KEY uq_user_topic (user_id, course_id, topic_id),
     FOREIGN KEY (user_id) REFERENCES user(id),
     FOREIGN KEY (course_id) REFERENCES course(id),
     FOREIGN KEY (topic_id) REFERENCES topic(id)
@@ -115,13 +119,49 @@ CREATE TABLE subject_level_translation (
     FOREIGN KEY (subject_level_id) REFERENCES subject_level(id)
 );
 
+CREATE TABLE lesson_content (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    subject_id INTEGER,
+    subject_level_id INTEGER,
+    instruction_language_id INTEGER,
+    topic_id INTEGER,
+    exercise_count INTEGER DEFAULT 0,
+    content TEXT NOT NULL,
+    use_count INTEGER DEFAULT 1,
+    create_date DATETIME,
+    INDEX ix_lesson_content_key (subject_id, subject_level_id, instruction_language_id, topic_id),
+    FOREIGN KEY (subject_id) REFERENCES subject(id),
+    FOREIGN KEY (subject_level_id) REFERENCES subject_level(id),
+    FOREIGN KEY (instruction_language_id) REFERENCES instruction_language(id),
+    FOREIGN KEY (topic_id) REFERENCES topic(id)
+);
+
+CREATE TABLE exercise_set (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INTEGER,
+    course_id INTEGER,
+    topic_id INTEGER,
+    lesson_content_id INTEGER,
+    exercise_type ENUM('speaking', 'writing', 'listening'),
+    exercise_count INTEGER DEFAULT 0,
+    correct_percentage REAL DEFAULT 0.0,
+    create_date DATETIME,
+    INDEX ix_exercise_set_user_course_date (user_id, course_id, create_date),
+    INDEX ix_exercise_set_user_date (user_id, create_date),
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    FOREIGN KEY (course_id) REFERENCES course(id),
+    FOREIGN KEY (topic_id) REFERENCES topic(id),
+    FOREIGN KEY (lesson_content_id) REFERENCES lesson_content(id)
+);
+
 CREATE TABLE exercise_result (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    user_topic_id INT,
+    exercise_set_id INTEGER NOT NULL,
+    `index` INTEGER,
     question VARCHAR(256),
     answer VARCHAR(256),
     score INT,
-    create_date DATE,
-    FOREIGN KEY (user_topic_id) REFERENCES user_topic(id)
+    create_date DATETIME,
+    INDEX ix_exercise_result_exercise_set_id (exercise_set_id),
+    FOREIGN KEY (exercise_set_id) REFERENCES exercise_set(id)
 );
-
@@ -1,13 +1,17 @@
 from .subject import Subject
+from .subject_translation import SubjectTanslation
 from .subject_category import SubjectCategory
 from .subject_level import SubjectLevel
 from .subject_level_translation import SubjectLevelTranslation
 from .topic import Topic
+from .topic_category import TopicCategory
 from .tutor import Tutor
 from .course import Course
 from .user import User
 from .device import Device
 from .user_course import UserCourse
+from .user_topic import UserTopic
+from .lesson_content import LessonContent
 from .exercise_set import ExerciseSet
 from .exercise_result import ExerciseResult
 from .instruction_language import InstructionLanguage
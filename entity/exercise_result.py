@@ -6,7 +6,7 @@ from sqlmodel import Field, SQLModel, Relationship
 class ExerciseResult(SQLModel, table=True):
     __tablename__ = "exercise_result"
     id: int | None = Field(default=None, primary_key=True)
-    exercise_set_id: int = Field(foreign_key="exercise_set.id")
+    exercise_set_id: int = Field(foreign_key="exercise_set.id", index=True)
     index: int
     question: str
     answer: str
@@ -1,11 +1,16 @@
 from datetime import datetime, timezone
 from typing import Optional
 from enum import Enum
-from sqlalchemy import Enum as SAEnum
+from sqlalchemy import Enum as SAEnum, Index
 from sqlmodel import Field, Relationship, SQLModel, Column, Integer, ForeignKey, DateTime
 
 class ExerciseSet(SQLModel, table=True):
     __tablename__ = 'exercise_set'
+    __table_args__ = (
+        # history pages of a user, with and without a course filter
+        Index("ix_exercise_set_user_course_date", "user_id", "course_id", "create_date"),
+        Index("ix_exercise_set_user_date", "user_id", "create_date"),
+    )
 
     class ExerciseTypeEnum(str, Enum):
         speaking  = "speaking"
@@ -15,7 +20,9 @@ class ExerciseSet(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
     user_id: int = Field(default=None, foreign_key="user.id")
     course_id: int = Field(default=None, foreign_key="course.id")
-    topic_id: int = Field(default=None, foreign_key="topic.id")
+    topic_id: Optional[int] = Field(default=None, foreign_key="topic.id")
+    # content of a speaking lesson, kept for replays
+    lesson_content_id: Optional[int] = Field(default=None, foreign_key="lesson_content.id")
     exercise_type: Optional[ExerciseTypeEnum] = Field(sa_column=SAEnum(ExerciseTypeEnum, name="exercise_type", nullable=True))
     exercise_count: int = Field(default=0)
     correct_percentage: float = Field(default=0.0)
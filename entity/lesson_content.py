@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from sqlalchemy import Index, Text
+from sqlmodel import Field, SQLModel, Column
+
+
+class LessonContent(SQLModel, table=True):
+    """
+    Generated text of a speaking lesson. Exercise sets point at the content
+    they were served, one row may be replayed to many users.
+    """
+    __tablename__ = "lesson_content"
+    __table_args__ = (
+        Index("ix_lesson_content_key", "subject_id", "subject_level_id", "instruction_language_id", "topic_id"),
+    )
+    id: int | None = Field(default=None, primary_key=True)
+    subject_id: int = Field(foreign_key="subject.id")
+    subject_level_id: int = Field(foreign_key="subject_level.id")
+    instruction_language_id: int = Field(foreign_key="instruction_language.id")
+    topic_id: int = Field(foreign_key="topic.id")
+    exercise_count: int = Field(default=0)
+    content: str = Field(sa_column=Column(Text, nullable=False))
+    use_count: int = Field(default=1)
+    create_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,13 +1,13 @@
 from typing import Optional
 from datetime import datetime, timezone
-from sqlmodel import Field, SQLModel, Relationship
+from sqlmodel import Field, SQLModel, Relationship, Column, String
 
 
 class SubjectLevelTranslation(SQLModel, table=True):
     __tablename__ = "subject_level_translation"
     id: int | None = Field(default=None, primary_key=True)
     subject_level_id: int = Field(foreign_key="subject_level.id")
-    lang_code: str
+    lang_code: str = Field(sa_column=Column("language_code", String(10), index=True))
     name: str
     description: str
 
@@ -1,10 +1,11 @@
 from typing import List
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Column, String
 
 
 class SubjectTanslation(SQLModel, table=True):
     __tablename__ = "subject_translation"
     id: int = Field(default=None, primary_key=True)
     subject_id: int = Field(foreign_key="subject.id")    
+    lang_code: str = Field(sa_column=Column("language_code", String(10), index=True))
     name: str
     description: str = None
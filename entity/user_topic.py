@@ -0,0 +1,20 @@
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class UserTopic(SQLModel, table=True):
+    """
+    Running totals of a user's submitted exercise sets per course and topic,
+    updated on every submission so progress never scans exercise history.
+    """
+    __tablename__ = "user_topic"
+    __table_args__ = (UniqueConstraint("user_id", "course_id", "topic_id", name="uq_user_topic"),)
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    course_id: int = Field(foreign_key="course.id")
+    topic_id: int = Field(foreign_key="topic.id")
+    is_active: bool = Field(default=True)
+    set_count: int = Field(default=0)
+    exercise_count: int = Field(default=0)
+    score_total: int = Field(default=0)
+    correct_percentage: float = Field(default=0.0)
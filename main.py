@@ -1,3 +1,4 @@
+import os
 import logging
 from dotenv import load_dotenv
 from fastapi import FastAPI, Depends, File, Request, UploadFile, HTTPException
@@ -6,9 +7,15 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from audio import SpeechToText    
 
-from routes import course_api, user_api, tutoring_api
-from utils import get_app_logger
-from db import init_db, start_db
+from routes import course_api, user_api, tutoring_api, metrics_api, bootstrap_api
+from utils import get_app_logger, RedisSettings, init_redis, close_redis
+from db import init_db, init_async_db, start_db, stop_db, get_async_session, DatabaseSettings
+from db.query_counter import QueryBudgetMiddleware
+from service.exercise_result_buffer import ExerciseResultBuffer
+from service.exercise_pool import ExercisePool
+from service.cache_service import CacheService
+from service.catalog_service import CatalogService
+from agent.client import LlmClientSettings, init_llm_clients, close_llm_clients
 
 
 load_dotenv()
@@ -24,14 +31,42 @@ logging.basicConfig(
 logger = get_app_logger(__name__)
 
 
+async def warm_catalog():
+    # a cold worker would send every first catalog request to the database
+    try:
+        async for session in get_async_session():
+            await CatalogService(session=session).get_catalog_async()
+    except Exception as e:
+        logger.error(f"Error warming up the catalog cache: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # database_url = "sqlite:///./sqlite.db"  # Example database URL
-    database_url = "mysql+mysqlconnector://localhost:3306/lingoDB"
-    engine = init_db(database_url)
+    # DATABASE_URL=sqlite:///./sqlite.db for local runs
+    settings = DatabaseSettings.from_env()
+    engine = init_db(settings)
     start_db(engine)
+    init_async_db(settings)
+    init_redis(RedisSettings.from_env())
+    init_llm_clients(LlmClientSettings.from_env())
+    # subscribes to cache invalidations of the other workers
+    cache = CacheService()
+    await warm_catalog()
+    result_buffer = ExerciseResultBuffer.configure_from_env()
+    if result_buffer:
+        result_buffer.start()
+    exercise_pool = ExercisePool.configure_from_env()
+    if exercise_pool:
+        exercise_pool.start()
     yield
-    # Clean up if any
+    if exercise_pool:
+        await exercise_pool.stop()
+    if result_buffer:
+        await result_buffer.stop()
+    cache.close()
+    await close_llm_clients()
+    await close_redis()
+    await stop_db()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -39,6 +74,12 @@ app = FastAPI(lifespan=lifespan)
 app.include_router(user_api.router, prefix="/api/user", tags=["Users"])
 app.include_router(course_api.router, prefix="/api/courses", tags=["Courses"])
 app.include_router(tutoring_api.router, prefix="/api/tutor", tags=["Tutor"])
+app.include_router(metrics_api.router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(bootstrap_api.router, prefix="/api/bootstrap", tags=["Bootstrap"])
+
+# test mode: fail requests that issue more SQL statements than their query_budget
+if os.getenv("SQL_QUERY_BUDGET_CHECK", "false").lower() == "true":
+    app.add_middleware(QueryBudgetMiddleware)
 
 @app.get("/")
 def read_root():
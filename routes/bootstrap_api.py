@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request, Response
+from fastapi.params import Depends
+from db.database import get_async_read_session
+from db.query_counter import query_budget
+
+from service import CourseService, CatalogService
+from utils import preferred_languages
+
+router = APIRouter()
+
+
+@router.post("")
+@query_budget(1 + CatalogService.LOAD_STATEMENTS)
+async def get_bootstrap(request: CourseService.BootstrapRequest, http_request: Request, session=Depends(get_async_read_session)):
+    service = CourseService(session=session)
+    body = await service.get_bootstrap_async(request, preferred_languages(http_request, request.lang))
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "private, no-cache"})
@@ -1,46 +1,57 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.params import Depends
 from fastapi.responses import StreamingResponse
-from db.database import get_session
+from db.database import get_session, get_read_session, get_async_read_session
+from db.query_counter import query_budget
 
 from entity import User
-from service import CourseService, SecurityService
+from service import CourseService, SecurityService, CatalogService
+from utils import cached_json_response, preferred_languages
 
 router = APIRouter()
 
+
+def catalog_response(request: Request, body: bytes, etag: str, lang: str, localized: bool = False):
+    # only subjects and levels depend on Accept-Language, other sections stay shared in caches
+    headers = {"Vary": "Accept-Language"} if localized else {}
+    if lang:
+        headers["Content-Language"] = lang
+    return cached_json_response(request, body, etag, headers=headers)
+
+
 @router.get("/subjects")
-def get_all_subjects(session=Depends(get_session)):
-    # TODO validate token
+@query_budget(CatalogService.LOAD_STATEMENTS)
+async def get_all_subjects(request: Request, lang: str | None = None, session=Depends(get_async_read_session)):
+   # TODO validate token
    service = CourseService(session=session)
-   languages = service.get_all_subjects()
-   return languages
+   return catalog_response(request, *await service.get_catalog_json_async("subjects", preferred_languages(request, lang)), localized=True)
 
 @router.get("/subject/levels/{category_id}")
-def get_subject_levels(category_id: int, session=Depends(get_session)):
+@query_budget(CatalogService.LOAD_STATEMENTS)
+async def get_subject_levels(category_id: int, request: Request, lang: str | None = None, session=Depends(get_async_read_session)):
     # TODO validate token
     service = CourseService(session=session)
-    levels = service.get_subject_levels(category_id=category_id)
-    return levels
+    return catalog_response(request, *await service.get_catalog_json_async(f"levels/{category_id}", preferred_languages(request, lang)), localized=True)
 
 @router.get("/tutors")
-def get_tutors(session=Depends(get_session)):
+@query_budget(CatalogService.LOAD_STATEMENTS)
+async def get_tutors(request: Request, session=Depends(get_async_read_session)):
     # TODO validate token
     service = CourseService(session=session)
-    tutors = service.get_tutors()
-    return tutors
+    return catalog_response(request, *await service.get_catalog_json_async("tutors"))
 
 @router.get("/instructionlanguages")
-def get_instruction_languages(session=Depends(get_session)):
+@query_budget(CatalogService.LOAD_STATEMENTS)
+async def get_instruction_languages(request: Request, session=Depends(get_async_read_session)):
     # TODO validate token
     service = CourseService(session=session)
-    instruction_languages = service.get_instruction_languages()
-    return instruction_languages
+    return catalog_response(request, *await service.get_catalog_json_async("instruction_languages"))
 
 @router.get("/topics/all")
-def get_all_topics(session=Depends(get_session)):
+@query_budget(CatalogService.LOAD_STATEMENTS)
+async def get_all_topics(request: Request, session=Depends(get_async_read_session)):
     service = CourseService(session=session)
-    topics = service.get_all_topics()
-    return topics
+    return catalog_response(request, *await service.get_catalog_json_async("topics"))
 
 @router.post("/myclass/add")
 def add_user_course(courseData: CourseService.UserCourseData, session=Depends(get_session)):
@@ -55,31 +66,57 @@ def update_user_course(course: CourseService.UserCourseData, session=Depends(get
     return userCourse
 
 @router.post("/myclasses")
-def get_user_classes(user: SecurityService.UserUuidInfo, session=Depends(get_session)):
+@query_budget(1)
+async def get_user_classes(user: SecurityService.UserUuidInfo, session=Depends(get_async_read_session)):
     service = CourseService(session=session)
-    courses = service.get_user_courses(user.user_uuid)
+    courses = await service.get_user_courses_async(user.user_uuid)
     return courses
 
 
+@router.post("/progress")
+@query_budget(1)
+async def get_user_progress(user: SecurityService.UserUuidInfo, session=Depends(get_async_read_session)):
+    service = CourseService(session=session)
+    return await service.get_user_progress_async(user.user_uuid)
+
+
+@router.post("/history")
+@query_budget(2)
+async def get_exercise_history(request: CourseService.ExerciseHistoryRequest, session=Depends(get_async_read_session)):
+    service = CourseService(session=session)
+    return await service.get_exercise_history_async(request)
+
+
 @router.post("/lesson/speaking")
+@query_budget(6 + CatalogService.LOAD_STATEMENTS)
 def get_speaking_lesson(request: CourseService.SpeakingLessonRequest, session=Depends(get_session)):
     service = CourseService(session=session)
     return StreamingResponse(service.get_speaking_lesson(request=request), media_type="text/plain")
 
 
 @router.post("/lesson/exercise/result")
+@query_budget(7)
 def submit_exercise_result(result: CourseService.ExerciseResultRequest, session=Depends(get_session)):
     service = CourseService(session=session)
     return service.submit_exercise_result(result)
 
 
+@router.post("/lesson/exercise/results/batch")
+@query_budget(7)
+def submit_exercise_results(results: CourseService.ExerciseResultBatchRequest, session=Depends(get_session)):
+    service = CourseService(session=session)
+    return service.submit_exercise_results(results)
+
+
 @router.post("/lesson/listening/generate")
-def generate_listening_lesson(request: CourseService.ListeningGenerateRequest, session=Depends(get_session)):
+@query_budget(1)
+def generate_listening_lesson(request: CourseService.ListeningGenerateRequest, session=Depends(get_read_session)):
     service = CourseService(session=session)
     return service.generate_listening_lesson(request=request)
 
 
 @router.post("/lesson/writing/generate")
-def generate_writing_lesson(request: CourseService.WritingGenerateRequest, session=Depends(get_session)):
+@query_budget(1)
+def generate_writing_lesson(request: CourseService.WritingGenerateRequest, session=Depends(get_read_session)):
     service = CourseService(session=session)
     return service.generate_writing_lesson(request=request)
\ No newline at end of file
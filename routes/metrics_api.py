@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from db import get_pool_stats
+from service import CacheService
+from service.exercise_pool import ExercisePool
+from agent.client import llm_client_stats, CachingAiClient
+
+router = APIRouter()
+
+
+@router.get("/db/pool")
+def get_db_pool_metrics():
+    return get_pool_stats()
+
+
+@router.get("/cache")
+def get_cache_metrics():
+    return CacheService().stats()
+
+
+@router.get("/llm")
+def get_llm_metrics():
+    return llm_client_stats()
+
+
+@router.get("/llm/cache")
+def get_llm_cache_metrics():
+    return CachingAiClient.stats_by_name()
+
+
+@router.get("/exercise-pool")
+def get_exercise_pool_metrics():
+    pool = ExercisePool.instance()
+    return pool.stats() if pool is not None else {}
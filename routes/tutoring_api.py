@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
 from fastapi.responses import StreamingResponse
-from db.database import get_session
+from starlette.concurrency import run_in_threadpool
+from db.database import get_async_session
+from db.query_counter import query_budget
 
 from utils import get_app_logger
-from service import TutoringService
+from service import TutoringService, CatalogService
 
 
 logger = get_app_logger(__name__)
@@ -13,15 +15,20 @@ router = APIRouter()
 
 
 @router.post("/{mode}/question")
-async def tutor_question(mode: str, req: TutoringService.AskTutorRequest, session=Depends(get_session)):
+@query_budget(1 + CatalogService.LOAD_STATEMENTS)
+async def tutor_question(mode: str, req: TutoringService.AskTutorRequest, session=Depends(get_async_session)):
     service = TutoringService(session=session)
-    if mode == "text":
-        return StreamingResponse(service.askForTextResponse(req))
-    elif mode == "audio":
-        response = service.askForAudioResponse(req)
-        if not response:
-            raise HTTPException(status_code=500, detail="Could not get answer from tutor with audio.")
-        return response
-    else:
+    if mode not in ("text", "audio"):
         raise HTTPException(status_code=400, detail="Invalid mode specified.")
 
+    course_info = await service.resolveCourseInfoAsync(req)
+    session_state = await service.resolveSessionStateAsync(req)
+    if mode == "text":
+        return StreamingResponse(service.askForTextResponse(req, course_info, session_state))
+
+    # LLM and TTS calls are blocking, keep them off the event loop
+    response = await run_in_threadpool(service.askForAudioResponse, req, course_info, session_state)
+    if not response:
+        raise HTTPException(status_code=500, detail="Could not get answer from tutor with audio.")
+    return response
+
@@ -2,4 +2,8 @@ from .course_service import CourseService
 from .user_service import UserService
 from .security_service import SecurityService
 from .cache_service import CacheService
+from .catalog_service import Catalog, CatalogService
+from .lesson_context_service import LessonContextService
+from .lesson_content_service import LessonContentService
+from .session_state_store import TutorSessionStore
 from .tutoring_service import TutoringService
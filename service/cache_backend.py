@@ -0,0 +1,144 @@
+import fnmatch
+import threading
+import time
+
+from utils import get_app_logger, get_redis
+
+logger = get_app_logger(__name__)
+
+
+class RedisCacheBackend:
+    """
+    Shared second tier of CacheService. Values are stored as bytes under
+    cache:<namespace>:<key>, invalidations are broadcast on a pub/sub channel.
+    """
+    KEY_PREFIX = "cache"
+    CHANNEL = "cache_invalidation"
+
+    def __init__(self):
+        self.redis = get_redis()
+        self._pubsub = None
+        self._listener = None
+
+
+    def get(self, key: str) -> bytes | None:
+        return self.redis.get(key)
+
+
+    def get_with_ttl(self, key: str) -> tuple[bytes, float | None] | None:
+        """
+        The value and its remaining TTL in seconds (None without expiry), None on a miss.
+        """
+        with self.redis.pipeline(transaction=False) as pipe:
+            value, pttl = pipe.get(key).pttl(key).execute()
+        if value is None:
+            return None
+        return value, pttl / 1000 if pttl > 0 else None
+
+
+    def set(self, key: str, value: bytes, ttl: float | None):
+        self.redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+
+    def delete(self, key: str):
+        self.redis.delete(key)
+
+
+    def delete_pattern(self, pattern: str) -> int:
+        keys = list(self.redis.scan_iter(match=pattern, count=500))
+        if keys:
+            self.redis.delete(*keys)
+        return len(keys)
+
+
+    def publish(self, message: str):
+        self.redis.publish(self.CHANNEL, message)
+
+
+    def subscribe(self, callback):
+        """
+        Calls callback(message: str) from a background thread for every broadcast.
+        """
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.CHANNEL: lambda message: callback(message["data"].decode())})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+class InMemoryCacheBackend:
+    """
+    Local stand-in for RedisCacheBackend, for tests and single-process runs.
+    Instances share one store and channel, like workers sharing a Redis server.
+    """
+    _store: dict[str, tuple[bytes, float | None]] = {}
+    _subscribers: list = []
+    _lock = threading.RLock()
+
+    def __init__(self):
+        self._callback = None
+
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del self._store[key]
+                return None
+            return entry[0]
+
+
+    def get_with_ttl(self, key: str) -> tuple[bytes, float | None] | None:
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                return None
+            expires_at = self._store[key][1]
+            return value, expires_at - time.monotonic() if expires_at is not None else None
+
+
+    def set(self, key: str, value: bytes, ttl: float | None):
+        with self._lock:
+            self._store[key] = (value, time.monotonic() + ttl if ttl else None)
+
+
+    def delete(self, key: str):
+        with self._lock:
+            self._store.pop(key, None)
+
+
+    def delete_pattern(self, pattern: str) -> int:
+        with self._lock:
+            keys = [key for key in self._store if fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                del self._store[key]
+            return len(keys)
+
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(message)
+
+
+    def subscribe(self, callback):
+        self._callback = callback
+        with self._lock:
+            self._subscribers.append(callback)
+
+
+    def close(self):
+        with self._lock:
+            if self._callback in self._subscribers:
+                self._subscribers.remove(self._callback)
+        self._callback = None
@@ -1,12 +1,72 @@
-
+import os
+import hmac
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import secrets
+import asyncio
+import threading
+from collections import OrderedDict
 from utils import get_app_logger
+from .cache_backend import RedisCacheBackend, InMemoryCacheBackend
 
 logger = get_app_logger(__name__)
 
+
+class CacheNamespace:
+    """
+    One LRU partition of the cache. Entries are (value, expires_at) kept in
+    recency order, expires_at is None for entries without a TTL.
+    """
+    def __init__(self, name: str, max_size: int, ttl: float | None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.remote_hits = 0
+
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "remote_hits": self.remote_hits,
+        }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
 class CacheService:
     """
-    Singleton implementation. TODO: distributed cache?
+    Singleton in-process cache. Keys live in namespaces, each bounded by
+    max_size with LRU eviction and an optional default TTL.
+    Defaults come from CACHE_MAX_SIZE and CACHE_TTL (seconds, 0 = no expiry),
+    set per namespace with CACHE_<NAMESPACE>_MAX_SIZE and CACHE_<NAMESPACE>_TTL.
+
+    With CACHE_BACKEND=redis (or memory, a local fake) a shared second tier sits
+    behind the local one: local misses are read from it, writes go to both and
+    invalidations are broadcast so every worker drops its local copy.
+    Shared values are pickles signed with HMAC-SHA256 under CACHE_SIGNING_KEY
+    (required for redis), values that fail the check are treated as misses
+    rather than unpickled.
     """
+    DEFAULT_NAMESPACE = "default"
     _instance = None
     _initialized = False
 
@@ -19,28 +79,311 @@ class CacheService:
 
     def __init__(self):
         if not self._initialized:
-            self.dictionary = {}
+            self._lock = threading.RLock()
+            self.default_max_size = int(os.getenv("CACHE_MAX_SIZE", "1000"))
+            self.default_ttl = float(os.getenv("CACHE_TTL", "0")) or None
+            self.namespaces: dict[str, CacheNamespace] = {}
+            self.node_id = uuid.uuid4().hex
+            self.remote = None
+            self._signing_key = None
+            # (namespace, key) -> in-flight load, see get_or_load
+            self._flights: dict[tuple[str, str], "_Flight"] = {}
+            self._async_flights: dict[tuple[str, str], asyncio.Future] = {}
             CacheService._initialized = True
+            self.configure_remote(os.getenv("CACHE_BACKEND", "local"))
+
+
+    def configure_remote(self, backend: str):
+        """
+        Switches the second tier: local (none), redis or memory.
+        """
+        if self.remote is not None:
+            self.remote.close()
+            self.remote = None
+
+        backend = backend.lower()
+        signing_key = os.getenv("CACHE_SIGNING_KEY", "")
+        if backend == "redis":
+            if not signing_key:
+                raise ValueError("CACHE_SIGNING_KEY is required with CACHE_BACKEND=redis")
+            self.remote = RedisCacheBackend()
+        elif backend == "memory":
+            self.remote = InMemoryCacheBackend()
+        elif backend != "local":
+            raise ValueError(f"Invalid CACHE_BACKEND {backend}")
+        # the in-memory tier never leaves this process, a random key will do
+        self._signing_key = signing_key.encode() if signing_key else secrets.token_bytes(32)
+
+        if self.remote is not None:
+            try:
+                self.remote.subscribe(self._on_invalidation)
+            except Exception as e:
+                logger.error(f"Can't subscribe to cache invalidations: {e}")
+            logger.info(f"cache second tier enabled ({backend})")
+
 
+    def close(self):
+        if self.remote is not None:
+            self.remote.close()
 
-    def add(self, key: str, value: any) -> bool:
-        if key in self.dictionary:
+
+    def configure_namespace(self, namespace: str, max_size: int | None = None, ttl: float | None = None):
+        """
+        Sets the bounds of a namespace, evicting entries if it shrinks.
+        """
+        with self._lock:
+            ns = self._namespace(namespace)
+            if max_size is not None:
+                ns.max_size = max_size
+            if ttl is not None:
+                ns.ttl = ttl
+            self._evict(ns)
+
+
+    def add(self, key: str, value: any, ttl: float | None = None, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        if self.contain(key, namespace=namespace):
             logger.debug(f"key {key} already exist")
             return False
-
-        self.dictionary[key] = value
+        self.set(key, value, ttl=ttl, namespace=namespace)
         return True
-    
 
-    def set(self, key: str, value: any):
-        self.dictionary[key] = value
 
+    def set(self, key: str, value: any, ttl: float | None = None, namespace: str = DEFAULT_NAMESPACE):
+        with self._lock:
+            ns = self._namespace(namespace)
+            self._store(ns, key, value, ttl)
+            ttl = ttl if ttl is not None else ns.ttl
+        if self.remote is not None:
+            # other workers re-read the new value from the shared tier
+            remote_key = self._remote_key(namespace, key)
+            self._remote_call("set", remote_key, self._sign(remote_key, pickle.dumps(value)), ttl)
+            self._broadcast(namespace=namespace, key=key)
+
+
+    def get(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> any:
+        with self._lock:
+            ns = self._namespace(namespace)
+            entry = self._lookup(ns, key)
+            if entry is not None:
+                ns.hits += 1
+                ns.entries.move_to_end(key)
+                return entry[0]
+
+        remote = self._remote_get(namespace, key)
+        with self._lock:
+            if remote is None:
+                ns.misses += 1
+                return None
+            value, ttl = remote
+            ns.remote_hits += 1
+            # the local copy expires with the shared one, not a full TTL later
+            self._store(ns, key, value, min(ttl, ns.ttl or ttl) if ttl is not None else None)
+            return value
+
+
+    def get_or_load(self, key: str, loader, ttl: float | None = None, namespace: str = DEFAULT_NAMESPACE) -> any:
+        """
+        Returns the cached value or stores loader(). Concurrent misses of the same
+        key wait for the first caller's load instead of running their own (single-flight).
+        """
+        value = self.get(key, namespace=namespace)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get((namespace, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(namespace, key)] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            self.set(key, flight.value, ttl=ttl, namespace=namespace)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(namespace, key)]
+            flight.done.set()
+
+
+    async def get_or_load_async(self, key: str, loader, ttl: float | None = None, namespace: str = DEFAULT_NAMESPACE) -> any:
+        """
+        get_or_load for coroutine loaders, loader() is awaited by one task per key.
+        The load runs in its own task, a caller that is cancelled doesn't cancel
+        it for the others.
+        """
+        value = self.get(key, namespace=namespace)
+        if value is not None:
+            return value
+
+        flight = self._async_flights.get((namespace, key))
+        if flight is None:
+            flight = asyncio.get_running_loop().create_task(self._load_async(key, loader, ttl, namespace))
+            self._async_flights[(namespace, key)] = flight
+            # mark retrieved so a flight nobody waited on doesn't log "exception was never retrieved"
+            flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(flight)
+
+
+    async def _load_async(self, key: str, loader, ttl: float | None, namespace: str) -> any:
+        try:
+            value = await loader()
+            self.set(key, value, ttl=ttl, namespace=namespace)
+            return value
+        finally:
+            del self._async_flights[(namespace, key)]
+
+
+    def contain(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        with self._lock:
+            if self._lookup(self._namespace(namespace), key) is not None:
+                return True
+        return self._remote_get(namespace, key) is not None
+
+
+    def invalidate(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        removed = self._drop_local(namespace, key=key) > 0
+        if self.remote is not None:
+            self._remote_call("delete", self._remote_key(namespace, key))
+            self._broadcast(namespace=namespace, key=key)
+        return removed
+
+
+    def invalidate_prefix(self, prefix: str, namespace: str | None = None) -> int:
+        """
+        Drops every key starting with prefix, in one namespace or in all of them.
+        """
+        removed = self._drop_local(namespace, prefix=prefix)
+        if self.remote is not None:
+            pattern = self._remote_key(namespace or "*", prefix) + "*"
+            self._remote_call("delete_pattern", pattern)
+            self._broadcast(namespace=namespace, prefix=prefix)
+        return removed
+
+
+    def clear(self, namespace: str | None = None):
+        # local tier only
+        with self._lock:
+            targets = [self._namespace(namespace)] if namespace is not None else self.namespaces.values()
+            for ns in targets:
+                ns.entries.clear()
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: ns.stats() for name, ns in self.namespaces.items()}
+
+
+    def _drop_local(self, namespace: str | None, key: str | None = None, prefix: str | None = None) -> int:
+        with self._lock:
+            targets = [self._namespace(namespace)] if namespace is not None else list(self.namespaces.values())
+            removed = 0
+            for ns in targets:
+                keys = [key] if prefix is None else [k for k in ns.entries if k.startswith(prefix)]
+                for k in keys:
+                    if ns.entries.pop(k, None) is not None:
+                        removed += 1
+            return removed
+
+
+    def _on_invalidation(self, message: str):
+        event = json.loads(message)
+        if event["origin"] != self.node_id:
+            self._drop_local(event["namespace"], key=event.get("key"), prefix=event.get("prefix"))
+
+
+    def _broadcast(self, namespace: str | None, key: str | None = None, prefix: str | None = None):
+        message = json.dumps({"origin": self.node_id, "namespace": namespace, "key": key, "prefix": prefix})
+        self._remote_call("publish", message)
+
+
+    def _remote_get(self, namespace: str, key: str) -> tuple[any, float | None] | None:
+        """
+        The shared value and its remaining TTL, None on a miss.
+        """
+        if self.remote is None:
+            return None
+        remote_key = self._remote_key(namespace, key)
+        entry = self._remote_call("get_with_ttl", remote_key)
+        if entry is None:
+            return None
+        data = self._verify(remote_key, entry[0])
+        if data is None:
+            logger.warning(f"Ignoring cache entry {remote_key} with a bad signature")
+            return None
+        return pickle.loads(data), entry[1]
+
+
+    def _sign(self, remote_key: str, data: bytes) -> bytes:
+        return self._digest(remote_key, data) + data
+
+
+    def _verify(self, remote_key: str, signed: bytes) -> bytes | None:
+        """
+        The pickle of a signed value, None unless it was written with our key for
+        this remote key. Only verified bytes reach pickle.loads.
+        """
+        digest, data = signed[:hashlib.sha256().digest_size], signed[hashlib.sha256().digest_size:]
+        return data if hmac.compare_digest(digest, self._digest(remote_key, data)) else None
+
+
+    def _digest(self, remote_key: str, data: bytes) -> bytes:
+        # the key is signed too, a value can't be moved to another key
+        return hmac.new(self._signing_key, remote_key.encode() + b"\0" + data, hashlib.sha256).digest()
+
+
+    def _remote_call(self, method: str, *args):
+        # the shared tier is an optimization, a Redis outage degrades to local only
+        try:
+            return getattr(self.remote, method)(*args)
+        except Exception as e:
+            logger.error(f"cache backend {method} failed: {e}")
+            return None
+
+
+    @staticmethod
+    def _remote_key(namespace: str, key: str) -> str:
+        return f"{RedisCacheBackend.KEY_PREFIX}:{namespace}:{key}"
+
+
+    def _namespace(self, namespace: str) -> CacheNamespace:
+        ns = self.namespaces.get(namespace)
+        if ns is None:
+            # CACHE_<NAMESPACE>_MAX_SIZE / CACHE_<NAMESPACE>_TTL override the defaults
+            prefix = f"CACHE_{namespace.upper()}"
+            max_size = int(os.getenv(f"{prefix}_MAX_SIZE", self.default_max_size))
+            ttl = float(os.getenv(f"{prefix}_TTL", self.default_ttl or 0)) or None
+            ns = self.namespaces[namespace] = CacheNamespace(namespace, max_size, ttl)
+        return ns
+
+
+    def _lookup(self, ns: CacheNamespace, key: str):
+        entry = ns.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del ns.entries[key]
+            ns.expirations += 1
+            return None
+        return entry
+
+
+    def _store(self, ns: CacheNamespace, key: str, value: any, ttl: float | None):
+        ttl = ttl if ttl is not None else ns.ttl
+        ns.entries[key] = (value, time.monotonic() + ttl if ttl else None)
+        ns.entries.move_to_end(key)
+        self._evict(ns)
 
-    def get(self, key: str) -> any:
-        if key in self.dictionary:
-            return self.dictionary[key]       
-        return None
-    
 
-    def contain(self, key: str) -> bool:
-        return (key in self.dictionary)
\ No newline at end of file
+    def _evict(self, ns: CacheNamespace):
+        while len(ns.entries) > ns.max_size:
+            key, _ = ns.entries.popitem(last=False)
+            ns.evictions += 1
+            logger.debug(f"evicted {key} from cache namespace {ns.name}")
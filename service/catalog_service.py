@@ -0,0 +1,208 @@
+import json
+import hashlib
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entity import Subject, SubjectLevel, Tutor, InstructionLanguage, Topic, SubjectTanslation, SubjectLevelTranslation
+from .cache_service import CacheService
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class Catalog:
+    """
+    Read-only snapshot of the reference data with dict indexes by id and code.
+    A refresh builds a new Catalog and swaps the reference, instances are never
+    mutated so readers need no locking. Entities are detached copies, a session
+    commit can't expire them.
+
+    Subjects and levels are also kept per translation language, untranslated
+    rows fall back to the base names. Response bodies are encoded once per
+    language so localized responses cost the same as the default ones.
+    """
+    # fields of each section in the response bodies, the ones the endpoints have always returned
+    FIELDS = {
+        "subjects": ("id", "name", "code", "category_id"),
+        "levels": ("id", "name", "description"),
+        "tutors": ("id", "name", "url", "description"),
+        "instruction_languages": ("id", "name", "code"),
+        "topics": ("id", "name", "topic_category_id", "subject_category_id"),
+    }
+
+    def __init__(self, subjects: list[Subject], levels: list[SubjectLevel], tutors: list[Tutor],
+                 instruction_languages: list[InstructionLanguage], topics: list[Topic],
+                 subject_translations: list[SubjectTanslation] = (), level_translations: list[SubjectLevelTranslation] = ()):
+        self.subjects = tuple(subjects)
+        self.levels = tuple(levels)
+        self.tutors = tuple(tutors)
+        self.instruction_languages = tuple(instruction_languages)
+        self.topics = tuple(topics)
+
+        self.subjects_by_id = {subject.id: subject for subject in self.subjects}
+        self.subjects_by_code = {subject.code: subject for subject in self.subjects}
+        self.levels_by_id = {level.id: level for level in self.levels}
+        self.tutors_by_id = {tutor.id: tutor for tutor in self.tutors}
+        self.instruction_languages_by_id = {lang.id: lang for lang in self.instruction_languages}
+        self.instruction_languages_by_code = {lang.code: lang for lang in self.instruction_languages}
+        self.topics_by_id = {topic.id: topic for topic in self.topics}
+
+        # levels and topics are defined per subject category
+        self.levels_by_category = Catalog._group(self.levels, "subject_category_id")
+        self.topics_by_category = Catalog._group(self.topics, "subject_category_id")
+
+        # lang_code -> localized copies of subjects / levels, in base order
+        self.localized_subjects = Catalog._localize(self.subjects, subject_translations, "subject_id")
+        self.localized_levels = Catalog._localize(self.levels, level_translations, "subject_level_id")
+        self.languages = tuple(sorted(set(self.localized_subjects) | set(self.localized_levels)))
+
+        # response bodies of the catalog endpoints, "" is the base language
+        self.encoded = {}
+        self.encoded_all = {}
+        for lang in ("",) + self.languages:
+            self._encode_language(lang)
+        self.version = self._hash()
+
+
+    def levels_of_subject(self, subject_id: int) -> tuple[SubjectLevel, ...]:
+        subject = self.subjects_by_id.get(subject_id)
+        return self.levels_by_category.get(subject.category_id, ()) if subject else ()
+
+
+    def resolve_language(self, preferred: list[str]) -> str:
+        """
+        First translation language matching the client's preferences, by full
+        tag then by primary subtag (es-MX matches es). "" when none matches.
+        """
+        by_tag = {lang.lower(): lang for lang in self.languages}
+        by_primary = {}
+        for lang in self.languages:
+            by_primary.setdefault(lang.lower().split("-")[0], lang)
+
+        for tag in preferred:
+            tag = tag.lower()
+            lang = by_tag.get(tag) or by_primary.get(tag.split("-")[0])
+            if lang:
+                return lang
+        return ""
+
+
+    def encoded_section(self, section: str, lang: str = "") -> bytes:
+        return self.encoded.get((lang, section)) or self.encoded.get(("", section), b"[]")
+
+
+    def _encode_language(self, lang: str):
+        subjects = self.localized_subjects.get(lang, self.subjects)
+        levels = self.localized_levels.get(lang, self.levels)
+        sections = {
+            "subjects": Catalog._encode(subjects, "subjects"),
+            "tutors": Catalog._encode(self.tutors, "tutors"),
+            "instruction_languages": Catalog._encode(self.instruction_languages, "instruction_languages"),
+            "topics": Catalog._encode(self.topics, "topics"),
+        }
+        for category_id, category_levels in Catalog._group(levels, "subject_category_id").items():
+            sections[f"levels/{category_id}"] = Catalog._encode(category_levels, "levels")
+        for section, body in sections.items():
+            # other languages only keep what differs from the base
+            if not lang or body != self.encoded[("", section)]:
+                self.encoded[(lang, section)] = body
+
+        # the whole catalog as one JSON object, for the bootstrap response
+        self.encoded_all[lang] = b"".join([
+            b'{"subjects":', sections["subjects"],
+            b',"levels":', Catalog._encode(levels, "levels"),
+            b',"tutors":', sections["tutors"],
+            b',"instruction_languages":', sections["instruction_languages"],
+            b',"topics":', sections["topics"],
+            b'}'
+        ])
+
+
+    @staticmethod
+    def _localize(items: tuple, translations, key: str) -> dict[str, tuple]:
+        by_lang = {}
+        for translation in translations:
+            by_lang.setdefault(translation.lang_code, {})[getattr(translation, key)] = translation
+
+        localized = {}
+        for lang, by_id in by_lang.items():
+            copies = []
+            for item in items:
+                translation = by_id.get(item.id)
+                if translation is None:
+                    copies.append(item)
+                else:
+                    copies.append(type(item)(**{**item.model_dump(), "name": translation.name,
+                                                "description": translation.description or item.description}))
+            localized[lang] = tuple(copies)
+        return localized
+
+
+    @staticmethod
+    def _group(items: tuple, attr: str) -> dict[int, tuple]:
+        groups = {}
+        for item in items:
+            groups.setdefault(getattr(item, attr), []).append(item)
+        return {key: tuple(values) for key, values in groups.items()}
+
+
+    @staticmethod
+    def _encode(items: tuple, section: str) -> bytes:
+        fields = Catalog.FIELDS[section]
+        return json.dumps([{field: getattr(item, field) for field in fields} for item in items],
+                          separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+    def _hash(self) -> str:
+        digest = hashlib.sha1()
+        for lang, section in sorted(self.encoded):
+            digest.update(f"{lang}:{section}".encode())
+            digest.update(self.encoded[(lang, section)])
+        return digest.hexdigest()[:16]
+
+
+class CatalogService:
+    """
+    Loads the Catalog through CacheService, so it expires, refreshes and is
+    invalidated across workers with the rest of the catalog namespace.
+    """
+    CACHE_KEY = "catalog"
+    CACHE_NAMESPACE = "catalog"
+    MODELS = (Subject, SubjectLevel, Tutor, InstructionLanguage, Topic, SubjectTanslation, SubjectLevelTranslation)
+    # statements of a cold load, for query budgets
+    LOAD_STATEMENTS = len(MODELS)
+
+    def __init__(self, session: Session | AsyncSession):
+        self.session = session
+
+
+    def get_catalog(self) -> Catalog:
+        return CacheService().get_or_load(CatalogService.CACHE_KEY, self._load, namespace=CatalogService.CACHE_NAMESPACE)
+
+
+    async def get_catalog_async(self) -> Catalog:
+        return await CacheService().get_or_load_async(CatalogService.CACHE_KEY, self._load_async,
+                                                      namespace=CatalogService.CACHE_NAMESPACE)
+
+
+    def _load(self) -> Catalog:
+        tables = [self.session.exec(CatalogService._query(model)).all() for model in CatalogService.MODELS]
+        return CatalogService._build(tables)
+
+
+    async def _load_async(self) -> Catalog:
+        tables = [(await self.session.exec(CatalogService._query(model))).all() for model in CatalogService.MODELS]
+        return CatalogService._build(tables)
+
+
+    @staticmethod
+    def _query(model):
+        return select(model).order_by(model.id)
+
+
+    @staticmethod
+    def _build(tables: list[list]) -> Catalog:
+        copies = [[type(row)(**row.model_dump()) for row in rows] for rows in tables]
+        catalog = Catalog(*copies)
+        logger.info(f"catalog loaded, version {catalog.version}")
+        return catalog
@@ -1,12 +1,26 @@
 import json
+import base64
+import asyncio
+from datetime import datetime, timezone
 from typing import List, Literal
 from pydantic import BaseModel
-from sqlmodel import Session, and_, select
+from sqlalchemy import case
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, and_, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException
-from entity import Subject, SubjectLevel, Tutor, InstructionLanguage, Topic, UserCourse, Course
-from entity import ExerciseSet, ExerciseResult
+from entity import UserCourse, Course
+from entity import ExerciseSet, ExerciseResult, UserTopic
 from .user_service import UserService
-from .cache_service import CacheService
+from .catalog_service import CatalogService
+from .lesson_context_service import LessonContextService
+from .lesson_content_service import LessonContentService
+from .exercise_result_buffer import ExerciseResultBuffer
+from .exercise_pool import ExercisePool
+from db import read_your_writes, use_primary
+from db.load_profiles import user_courses_statement, user_progress_statement
+from db.load_profiles import exercise_history_statement, exercise_results_statement
 from utils import get_app_logger
 from agent import SpeakingLessonAgent, ListeningGeneratorAgent, WritingGeneratorAgent
 
@@ -36,6 +50,7 @@ class CourseService:
         instruction_language_id: int
         topic_id: int
         lesson_type: str
+        exercise_set_id: int | None = None     # resumes a set, replaying its stored lesson
 
     class QnAResult(BaseModel):
         id: int
@@ -47,11 +62,59 @@ class CourseService:
         user_uuid: str
         exercise_set_id: int
         result: List["QnAResult"]
+
+    class ExerciseSetResult(BaseModel):
+        exercise_set_id: int
+        result: List["QnAResult"]
+
+    class ExerciseResultBatchRequest(BaseModel):
+        user_uuid: str
+        exercise_sets: List["ExerciseSetResult"]
      
     class ExerciseResultResponse(BaseModel):
         exercise_set_id: int
         correct_percentage: float
 
+    class TopicProgress(BaseModel):
+        topic_id: int
+        set_count: int
+        exercise_count: int
+        correct_percentage: float
+
+    class CourseProgress(BaseModel):
+        course_id: int
+        set_count: int
+        exercise_count: int
+        correct_percentage: float
+        topics: list["TopicProgress"]
+
+    class BootstrapRequest(BaseModel):
+        user_uuid: str
+        catalog_version: str | None = None     # version of the catalog the client has
+        lang: str | None = None                # overrides Accept-Language
+
+    class ExerciseHistoryRequest(BaseModel):
+        user_uuid: str
+        course_id: int | None = None
+        topic_id: int | None = None
+        exercise_type: ExerciseSet.ExerciseTypeEnum | None = None
+        cursor: str | None = None     # next_cursor of the previous page
+        limit: int = 20
+
+    class ExerciseHistoryItem(BaseModel):
+        exercise_set_id: int
+        course_id: int
+        topic_id: int | None
+        exercise_type: str | None
+        exercise_count: int
+        correct_percentage: float
+        create_date: datetime
+        result: list["QnAResult"]
+
+    class ExerciseHistoryPage(BaseModel):
+        items: list["ExerciseHistoryItem"]
+        next_cursor: str | None
+
 
     class ListeningGenerateRequest(BaseModel):
         user_uuid: str
@@ -83,73 +146,65 @@ class CourseService:
         word_bank: list[str]             # shuffled, includes distractors
 
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session | AsyncSession):
         self.session = session
-        self.user_service = UserService(session=session)    
+        self.user_service = UserService(session=session)
+        self.catalog_service = CatalogService(session=session)
 
 
     def get_all_subjects(self):
-        cache = CacheService()
-        key = "all_subjects"
-        if cache.contain(key=key):
-            return cache.get(key=key)
-        
-        stmt = select(Subject.id, Subject.name, Subject.code, Subject.category_id)
-        rows = self.session.exec(stmt).all()
-        subjects = [Subject(id=row.id, name=row.name, code=row.code, category_id=row.category_id) for row in rows]
-        cache.add(key=key, value=subjects)
-        return subjects
+        return list(self.catalog_service.get_catalog().subjects)
+
+
+    async def get_all_subjects_async(self):
+        return list((await self.catalog_service.get_catalog_async()).subjects)
 
 
     def get_subject_levels(self, category_id: int):
-        cache = CacheService()
-        key = f"all_levels_{category_id}"
-        if cache.contain(key=key):
-            return cache.get(key=key)
-        
-        stmt = select(SubjectLevel.id, SubjectLevel.name, SubjectLevel.description).where(SubjectLevel.subject_category_id == category_id)
-        rows = self.session.exec(stmt).all()
-        levels = [SubjectLevel(id=row.id, name=row.name, description=row.description) for row in rows]
-        cache.add(key=key, value=levels)
-        return levels
+        return list(self.catalog_service.get_catalog().levels_by_category.get(category_id, ()))
+
+
+    async def get_subject_levels_async(self, category_id: int):
+        return list((await self.catalog_service.get_catalog_async()).levels_by_category.get(category_id, ()))
     
 
     def get_tutors(self):
-        cache = CacheService()
-        key = "tutors"
-        if cache.contain(key=key):
-            return cache.get(key=key)
-        
-        stmt = select(Tutor.id, Tutor.name, Tutor.description, Tutor.url)
-        rows = self.session.exec(stmt).all()
-        tutors = [Tutor(id=row.id, name=row.name, url=row.url, description=row.description) for row in rows]
-        cache.add(key=key, value=tutors)
-        return tutors
+        return list(self.catalog_service.get_catalog().tutors)
+
+
+    async def get_tutors_async(self):
+        return list((await self.catalog_service.get_catalog_async()).tutors)
     
 
     def get_instruction_languages(self):
-        cache = CacheService()
-        key = "instruction_languages"
-        if cache.contain(key=key):
-            return cache.get(key=key)
-        stmt = select(InstructionLanguage.id, InstructionLanguage.name, InstructionLanguage.code)
-        rows = self.session.exec(stmt).all()
-        languages = [InstructionLanguage(id=row.id, name=row.name, code=row.code) for row in rows]
-        cache.add(key=key, value=languages)
-        return languages
+        return list(self.catalog_service.get_catalog().instruction_languages)
+
+
+    async def get_instruction_languages_async(self):
+        return list((await self.catalog_service.get_catalog_async()).instruction_languages)
 
 
     def get_all_topics(self):
-        cache = CacheService()
-        key = "all_topics"
-        if cache.contain(key=key):
-            return cache.get(key=key)
-        
-        stmt = select(Topic.id, Topic.name, Topic.topic_category_id, Topic.subject_category_id)
-        rows = self.session.exec(stmt).all()
-        topics = [Topic(id=row.id, name=row.name, topic_category_id=row.topic_category_id, subject_category_id=row.subject_category_id) for row in rows]
-        cache.add(key=key, value=topics)
-        return topics
+        return list(self.catalog_service.get_catalog().topics)
+
+
+    async def get_all_topics_async(self):
+        return list((await self.catalog_service.get_catalog_async()).topics)
+
+
+    async def get_catalog_json_async(self, section: str, languages: list[str] = ()) -> tuple[bytes, str, str]:
+        """
+        Pre-encoded body of a catalog section in the first available language
+        of languages, its strong ETag and the language ("" for the base names).
+        """
+        catalog = await self.catalog_service.get_catalog_async()
+        lang = catalog.resolve_language(languages)
+        return catalog.encoded_section(section, lang), CourseService._catalog_etag(catalog, lang), lang
+
+
+    @staticmethod
+    def _catalog_etag(catalog, lang: str) -> str:
+        return f'"{catalog.version}-{lang}"' if lang else f'"{catalog.version}"'
     
 
     def add_user_course(self, data: UserCourseData):
@@ -165,20 +220,20 @@ class CourseService:
                 self.session.refresh(course)
             data.course_id = course.id
 
-        user = self.user_service.get_user_by_uuid(data.user_uuid)
+        user = self.user_service.get_user_by_uuid(data.user_uuid, profile="user_courses")
         if not user:
             logger.info(f"Can't find user {data.user_uuid}")
             return None
         
-        item = next((uc for uc in user.courses if uc.course_id == course.id), None)
+        item = next((uc for uc in user.courses if uc.course_id == data.course_id), None)
 
         if item != None:
-            logger.debug(f"user id={user.id} with course_id={course.id} aleady exist")
+            logger.debug(f"user id={user.id} with course_id={data.course_id} aleady exist")
             return item
         
         userCourse = UserCourse(
             user_id=user.id,
-            course_id=course.id,
+            course_id=data.course_id,
             tutor_id=data.tutor_id,
             is_active=True,
             instruction_language_id=data.instruction_language_id,
@@ -186,8 +241,10 @@ class CourseService:
         self.session.add(userCourse)
         self.session.commit()
         self.session.refresh(userCourse)
+        read_your_writes.record_write(data.user_uuid)
+        LessonContextService.invalidate(data.user_uuid, data.course_id)
 
-        logger.debug(f"Add course_id={course.id} for user {user.id}")
+        logger.debug(f"Add course_id={data.course_id} for user {user.id}")
 
         return data
     
@@ -216,6 +273,8 @@ class CourseService:
         self.session.add(item)
         self.session.commit()
         self.session.refresh(item)
+        read_your_writes.record_write(data.user_uuid)
+        LessonContextService.invalidate(data.user_uuid, data.course_id)
 
         logger.debug(f"Update course_id={data.course_id} for user {user.id}")
 
@@ -223,15 +282,48 @@ class CourseService:
 
 
     def get_user_courses(self, user_uuid: str) -> list[UserCourseData]:
-        user = self.user_service.get_user_by_uuid(user_uuid)
-        
+        if read_your_writes.recently_wrote(user_uuid):
+            use_primary(self.session)
+        rows = self.session.exec(user_courses_statement(user_uuid)).all()
+        return CourseService._to_user_course_data(user_uuid, rows)
+
+
+    async def get_bootstrap_async(self, request: BootstrapRequest, languages: list[str] = ()) -> bytes:
+        """
+        JSON body of the app launch data: the catalog in the first available
+        language of languages and the user's courses. "catalog" is null when
+        the client's catalog_version is current.
+        """
+        catalog = await self.catalog_service.get_catalog_async()
+        lang = catalog.resolve_language(languages)
+        version = f"{catalog.version}-{lang}" if lang else catalog.version
+        courses = await self.get_user_courses_async(request.user_uuid)
+        encoded_courses = b"[" + b",".join(course.model_dump_json().encode() for course in courses) + b"]"
+        encoded_catalog = b"null" if request.catalog_version == version else catalog.encoded_all[lang]
+        return b"".join([
+            b'{"catalog_version":"', version.encode(),
+            b'","catalog":', encoded_catalog,
+            b',"courses":', encoded_courses,
+            b'}'
+        ])
+
+
+    async def get_user_courses_async(self, user_uuid: str) -> list[UserCourseData]:
+        if read_your_writes.recently_wrote(user_uuid):
+            use_primary(self.session)
+        rows = (await self.session.exec(user_courses_statement(user_uuid))).all()
+        return CourseService._to_user_course_data(user_uuid, rows)
+
+
+    @staticmethod
+    def _to_user_course_data(user_uuid: str, rows) -> list[UserCourseData]:
         results = []
-        for uc in user.courses:
+        for uc, course in rows:
             item = CourseService.UserCourseData(
                 user_uuid=user_uuid,
                 course_id=uc.course_id,
-                subject_id=uc.course.subject_id, 
-                level_id=uc.course.subject_level_id, 
+                subject_id=course.subject_id, 
+                level_id=course.subject_level_id, 
                 tutor_id=uc.tutor_id, 
                 instruction_language_id=uc.instruction_language_id
             )
@@ -240,89 +332,382 @@ class CourseService:
         return results
 
 
-    def get_speaking_lesson(self, request: SpeakingLessonRequest):
-        user = self.user_service.get_user_by_uuid(request.user_uuid)
-        user_course = next((item for item in user.courses if item.course_id == request.course_id), None)
-        if user_course == None:
-            logger.debug("can't find course {request.course_id} for user {request.user_uuid}")
+    def get_user_progress(self, user_uuid: str) -> list[CourseProgress]:
+        if read_your_writes.recently_wrote(user_uuid):
+            use_primary(self.session)
+        rollups = self.session.exec(user_progress_statement(user_uuid)).all()
+        return CourseService._to_course_progress(rollups)
+
+
+    async def get_user_progress_async(self, user_uuid: str) -> list[CourseProgress]:
+        if read_your_writes.recently_wrote(user_uuid):
+            use_primary(self.session)
+        rollups = (await self.session.exec(user_progress_statement(user_uuid))).all()
+        return CourseService._to_course_progress(rollups)
+
+
+    @staticmethod
+    def _to_course_progress(rollups: list[UserTopic]) -> list[CourseProgress]:
+        courses = {}
+        for rollup in rollups:
+            course = courses.get(rollup.course_id)
+            if course is None:
+                course = courses[rollup.course_id] = CourseService.CourseProgress(
+                    course_id=rollup.course_id, set_count=0, exercise_count=0, correct_percentage=0.0, topics=[])
+            course.topics.append(CourseService.TopicProgress(
+                topic_id=rollup.topic_id,
+                set_count=rollup.set_count,
+                exercise_count=rollup.exercise_count,
+                correct_percentage=rollup.correct_percentage
+            ))
+            course.set_count += rollup.set_count
+            course.exercise_count += rollup.exercise_count
+            # running score total, turned into a percentage below
+            course.correct_percentage += rollup.score_total
+
+        for course in courses.values():
+            course.correct_percentage = course.correct_percentage / course.exercise_count if course.exercise_count else 0.0
+        return list(courses.values())
+
+
+    MAX_HISTORY_PAGE_SIZE = 100
+
+    async def get_exercise_history_async(self, request: ExerciseHistoryRequest) -> ExerciseHistoryPage:
+        """
+        One page of a user's exercise sets, newest first, with their answers.
+        Two SELECTs per page whatever the depth of the cursor.
+        """
+        if read_your_writes.recently_wrote(request.user_uuid):
+            use_primary(self.session)
+
+        limit = max(1, min(request.limit, CourseService.MAX_HISTORY_PAGE_SIZE))
+        stmt = exercise_history_statement(
+            request.user_uuid,
+            limit + 1,
+            course_id=request.course_id,
+            topic_id=request.topic_id,
+            exercise_type=request.exercise_type,
+            before=CourseService._decode_history_cursor(request.cursor)
+        )
+        exercise_sets = (await self.session.exec(stmt)).all()
+        has_more = len(exercise_sets) > limit
+        exercise_sets = exercise_sets[:limit]
+
+        results = []
+        if exercise_sets:
+            stmt = exercise_results_statement([exercise_set.id for exercise_set in exercise_sets])
+            results = (await self.session.exec(stmt)).all()
+
+        next_cursor = CourseService._encode_history_cursor(exercise_sets[-1]) if has_more else None
+        return CourseService._to_history_page(exercise_sets, results, next_cursor)
+
+
+    @staticmethod
+    def _to_history_page(exercise_sets: list[ExerciseSet], results: list[ExerciseResult], next_cursor: str | None) -> ExerciseHistoryPage:
+        # a resubmitted set keeps its old rows. Results come in id order and the
+        # set's exercise_count is the size of its latest submission, which is
+        # written after the older ones (resubmissions serialize on the set row),
+        # so the latest answers are the set's exercise_count highest ids
+        results_by_set = {}
+        for result in results:
+            results_by_set.setdefault(result.exercise_set_id, []).append(result)
+
+        answers = {}
+        for exercise_set in exercise_sets:
+            latest = results_by_set.get(exercise_set.id, [])[-exercise_set.exercise_count:] if exercise_set.exercise_count else []
+            answers[exercise_set.id] = [CourseService.QnAResult(
+                id=result.index, question=result.question, answer=result.answer, score=result.score) for result in latest]
+
+        items = []
+        for exercise_set in exercise_sets:
+            exercise_type = exercise_set.exercise_type
+            items.append(CourseService.ExerciseHistoryItem(
+                exercise_set_id=exercise_set.id,
+                course_id=exercise_set.course_id,
+                topic_id=exercise_set.topic_id,
+                exercise_type=exercise_type.value if isinstance(exercise_type, ExerciseSet.ExerciseTypeEnum) else exercise_type,
+                exercise_count=exercise_set.exercise_count,
+                correct_percentage=exercise_set.correct_percentage,
+                create_date=exercise_set.create_date,
+                result=answers[exercise_set.id]
+            ))
+        return CourseService.ExerciseHistoryPage(items=items, next_cursor=next_cursor)
+
+
+    @staticmethod
+    def _encode_history_cursor(exercise_set: ExerciseSet) -> str:
+        value = json.dumps([exercise_set.create_date.isoformat(), exercise_set.id])
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+    @staticmethod
+    def _decode_history_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+        if not cursor:
             return None
+        try:
+            create_date, set_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(create_date), int(set_id)
+        except (ValueError, TypeError) as e:
+            logger.info(f"Invalid history cursor {cursor}: {e}")
+            raise HTTPException(status_code=400, detail="Bad Request")
+
+
+    def get_speaking_lesson(self, request: SpeakingLessonRequest):
+        """
+        Does all DB work up front and returns the generator of the lesson stream.
+        The session is closed before the stream starts, so its connection is back
+        in the pool while the LLM answers. A stored lesson, reused or resumed with
+        exercise_set_id, is replayed instead of generated.
+        """
+        context = LessonContextService(session=self.session).get_context(request.user_uuid, request.course_id)
+        if context == None:
+            logger.debug(f"can't find course {request.course_id} for user {request.user_uuid}")
+            raise HTTPException(status_code=400, detail="Bad Request")
+
+        lessons = LessonContentService(session=self.session)
+        exercise_set, content = None, None
+        topic_id = request.topic_id
+        if request.exercise_set_id is not None:
+            found = lessons.get_exercise_set(context.context.user_id, request.exercise_set_id)
+            if found is None or found[0].course_id != request.course_id \
+                    or found[0].exercise_type != ExerciseSet.ExerciseTypeEnum.speaking:
+                logger.info(f"Can't find exercise set id={request.exercise_set_id} for user {request.user_uuid}")
+                raise HTTPException(status_code=400, detail="Bad Request")
+            exercise_set, content = found
+            topic_id = exercise_set.topic_id
         
-        course = user_course.course
+        subject, level, tutor, inst_lang = context.subject, context.level, context.tutor, context.inst_lang
+        topic = self.catalog_service.get_catalog().topics_by_id.get(topic_id)
 
-        level_category = 1 # TODO we hard code the subject category
         exercise_count = 10
-        subject = next((s for s in self.get_all_subjects() if s.id == course.subject_id), None)
-        level = next((l for l in self.get_subject_levels(level_category) if l.id == course.subject_level_id), None)
-        tutor = next((t for t in self.get_tutors() if t.id == user_course.tutor_id), None)
-        inst_lang = next((i for i in self.get_instruction_languages() if i.id == user_course.instruction_language_id), None)
-        topic = next((tp for tp in self.get_all_topics() if tp.id == request.topic_id), None)
-
-        if subject and level and tutor and inst_lang:
-            agent = SpeakingLessonAgent(subject=subject, level=level, tutor=tutor, inst_lang=inst_lang, topic=topic.name, exercise_count=exercise_count)
-            try:
-                exercise_set = self._create_exercise_set(user_id=user.id, course_id=course.id, topic_id=topic.id, lesson_type=request.lesson_type)
-                yield f'{{"exercise_set_id":{exercise_set.id},"count":{exercise_count}}}\n'
-                for chunk in agent.ask_ai_stream("Please give me a new set of exercises"):
-                    yield chunk
-            except Exception as e:
-                logger.error(f"Error processing QnA: {e}")
-                raise HTTPException(status_code=500, detail="Internal Server Error")
-        else:
-            logger.info(f"Invalid request: {json.dumps(request)}")
+
+        if not (subject and level and tutor and inst_lang and topic):
+            logger.info(f"Invalid request: {request.model_dump_json()}")
             raise HTTPException(status_code=400, detail="Bad Request")
 
+        key = LessonContentService.LessonKey(subject_id=subject.id, subject_level_id=level.id,
+                                             instruction_language_id=inst_lang.id, topic_id=topic.id,
+                                             exercise_count=exercise_count)
+        try:
+            if exercise_set is None:
+                content = lessons.find_reusable(context.context.user_id, key)
+                exercise_set = self._create_exercise_set(user_id=context.context.user_id, course_id=context.context.course_id, topic_id=topic.id,
+                                                         lesson_type=request.lesson_type, lesson_content_id=content.id if content else None)
+                read_your_writes.record_write(request.user_uuid)
+            exercise_set_id = exercise_set.id
+            stored = content.content if content else None
+        except Exception as e:
+            logger.error(f"Error creating exercise set: {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+        finally:
+            self.session.close()
+
+        if stored is not None:
+            return CourseService._replay_speaking_lesson(stored, exercise_set_id, exercise_count)
+        agent = SpeakingLessonAgent(subject=subject, level=level, tutor=tutor, inst_lang=inst_lang, topic=topic.name, exercise_count=exercise_count)
+        return CourseService._stream_speaking_lesson(agent, exercise_set_id, exercise_count, key)
+
+
+    @staticmethod
+    async def _stream_speaking_lesson(agent: SpeakingLessonAgent, exercise_set_id: int, exercise_count: int,
+                                      key: LessonContentService.LessonKey):
+        try:
+            yield f'{{"exercise_set_id":{exercise_set_id},"count":{exercise_count}}}\n'
+            chunks = []
+            async for chunk in agent.ask_ai_stream_async("Please give me a new set of exercises"):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error processing QnA: {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+
+        # only complete lessons are stored, a failure to store doesn't concern the client
+        content = "".join(chunks)
+        if not LessonContentService.is_complete(content, exercise_count):
+            logger.warning(f"Not storing incomplete lesson of exercise set id={exercise_set_id}, {len(content)} chars")
+            return
+        try:
+            await asyncio.to_thread(LessonContentService.save, key, content, exercise_set_id)
+        except Exception as e:
+            logger.error(f"Error storing lesson of exercise set id={exercise_set_id}: {e}")
+
+
+    @staticmethod
+    def _replay_speaking_lesson(content: str, exercise_set_id: int, exercise_count: int):
+        yield f'{{"exercise_set_id":{exercise_set_id},"count":{exercise_count}}}\n'
+        yield from LessonContentService.replay(content)
+
 
     def submit_exercise_result(self, data: ExerciseResultRequest) -> ExerciseResultResponse:
-        user = self.user_service.get_user_by_uuid(data.user_uuid)
-        if not user:
-            logger.info(f"Can't find user {data.user_uuid}")
+        return self._submit_exercise_results(data.user_uuid, [data])[0]
+
+
+    def submit_exercise_results(self, data: ExerciseResultBatchRequest) -> list[ExerciseResultResponse]:
+        return self._submit_exercise_results(data.user_uuid, data.exercise_sets)
+
+
+    def _submit_exercise_results(self, user_uuid: str, submissions: list[ExerciseSetResult]) -> list[ExerciseResultResponse]:
+        set_ids = {submission.exercise_set_id for submission in submissions}
+        if len(set_ids) != len(submissions):
+            # the rollup deltas and the buffer assume one submission per set
+            logger.info(f"Duplicate exercise set ids in batch of user {user_uuid}")
             raise HTTPException(status_code=400, detail="Bad Request")
-        
+
+        user = self.user_service.get_user_by_uuid(user_uuid)
+        if user.id is None:
+            logger.info(f"Can't find user {user_uuid}")
+            raise HTTPException(status_code=400, detail="Bad Request")
+
         stmt = select(ExerciseSet).where(
             and_(
-                ExerciseSet.id == data.exercise_set_id,
+                ExerciseSet.id.in_(set_ids),
                 ExerciseSet.user_id == user.id
             )
         )
-        exercise_set = self.session.exec(stmt).first()
-        if not exercise_set:
-            logger.info(f"Can't find exercise set id={data.exercise_set_id} for user id={user.id}")
+        exercise_sets = {exercise_set.id: exercise_set for exercise_set in self.session.exec(stmt).all()}
+        missing = set_ids - exercise_sets.keys()
+        if missing:
+            logger.info(f"Can't find exercise set ids={sorted(missing)} for user id={user.id}")
             raise HTTPException(status_code=400, detail="Bad Request")
 
-        total_score = 0
-        for result in data.result:
-            from entity.exercise_result import ExerciseResult
-            exercise_result = ExerciseResult(
-                exercise_set_id=data.exercise_set_id,
-                index=result.id,
-                question=result.question,
-                answer=result.answer,
-                score=result.score
-            )
-            self.session.add(exercise_result)
-            total_score += result.score
-
-        average_score = total_score / len(data.result) if data.result else 0.0
-        exercise_set.exercise_count = len(data.result)
-        exercise_set.correct_percentage = average_score
-        self.session.add(exercise_set)
+        user_id = user.id
+        buffer = ExerciseResultBuffer.instance()
+        if buffer is None:
+            self._write_exercise_results(exercise_sets, submissions)
+            self.session.commit()
+        elif not buffer.offer(user_uuid, [(submission.exercise_set_id, [r.model_dump() for r in submission.result])
+                                          for submission in submissions]):
+            # writing inline could land before older queued submissions of the same sets
+            raise HTTPException(status_code=503, detail="Service Unavailable", headers={"Retry-After": str(max(1, round(buffer.flush_interval)))})
+        read_your_writes.record_write(user_uuid)
+
+        responses = [CourseService._score_exercise_set(submission) for submission in submissions]
+        for response in responses:
+            logger.debug(f"User {user_id} submitted exercise set id={response.exercise_set_id} with score={response.correct_percentage}")
+
+        return responses
+
+
+    def write_buffered_results(self, items: list[dict]):
+        """
+        Writes submissions queued by ExerciseResultBuffer. Ownership was checked when they were queued.
+        """
+        submissions = [CourseService.ExerciseSetResult(**item) for item in items]
+        set_ids = {submission.exercise_set_id for submission in submissions}
+        exercise_sets = {exercise_set.id: exercise_set for exercise_set in
+                         self.session.exec(select(ExerciseSet).where(ExerciseSet.id.in_(set_ids))).all()}
+        submissions = [submission for submission in submissions if submission.exercise_set_id in exercise_sets]
+        self._write_exercise_results(exercise_sets, submissions)
         self.session.commit()
 
-        logger.debug(f"User {user.id} submitted exercise set id={data.exercise_set_id} with score={average_score}")
 
-        response = CourseService.ExerciseResultResponse(
-            exercise_set_id=exercise_set.id,
+    def _write_exercise_results(self, exercise_sets: dict[int, ExerciseSet], submissions: list[ExerciseSetResult]):
+        """
+        Stages the answers of all submissions with one executemany INSERT and updates
+        the score of each exercise set. The caller commits.
+        """
+        now = datetime.now(timezone.utc)
+        rows = []
+        progress = {}
+        for submission in submissions:
+            for result in submission.result:
+                rows.append({
+                    "exercise_set_id": submission.exercise_set_id,
+                    "index": result.id,
+                    "question": result.question,
+                    "answer": result.answer,
+                    "score": result.score,
+                    "create_date": now,
+                })
+
+            score = CourseService._score_exercise_set(submission)
+            exercise_set = exercise_sets[submission.exercise_set_id]
+            CourseService._add_progress_delta(progress, exercise_set, submission)
+            exercise_set.exercise_count = len(submission.result)
+            exercise_set.correct_percentage = score.correct_percentage
+            self.session.add(exercise_set)
+
+        if rows:
+            self.session.exec(insert(ExerciseResult), params=rows)
+        self._apply_progress_deltas(progress)
+
+
+    @staticmethod
+    def _add_progress_delta(progress: dict, exercise_set: ExerciseSet, submission: ExerciseSetResult):
+        # a resubmitted set replaces its previous answers, so only the difference is added
+        if exercise_set.topic_id is None:
+            return
+        key = (exercise_set.user_id, exercise_set.course_id, exercise_set.topic_id)
+        old_total = round(exercise_set.correct_percentage * exercise_set.exercise_count)
+        delta = progress.setdefault(key, [0, 0, 0])
+        delta[0] += 1 if exercise_set.exercise_count == 0 else 0
+        delta[1] += len(submission.result) - exercise_set.exercise_count
+        delta[2] += sum(result.score for result in submission.result) - old_total
+
+
+    def _apply_progress_deltas(self, progress: dict):
+        """
+        Adds the deltas to the rollups with one upsert, so concurrent first
+        submissions of a topic can't both insert its row.
+        """
+        if not progress:
+            return
+
+        rows = [{
+            "user_id": user_id,
+            "course_id": course_id,
+            "topic_id": topic_id,
+            "set_count": set_delta,
+            "exercise_count": exercise_delta,
+            "score_total": score_delta,
+            "correct_percentage": score_delta / exercise_delta if exercise_delta else 0.0,
+        } for (user_id, course_id, topic_id), (set_delta, exercise_delta, score_delta) in progress.items()]
+        self.session.exec(CourseService._upsert_rollups(self.session.get_bind().dialect.name, rows))
+
+
+    @staticmethod
+    def _upsert_rollups(dialect: str, rows: list[dict]):
+        if dialect == "mysql":
+            stmt = mysql_insert(UserTopic).values(rows)
+            added = stmt.inserted
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(UserTopic).values(rows)
+            added = stmt.excluded
+        else:
+            raise ValueError(f"Unsupported dialect {dialect}")
+
+        exercise_count = UserTopic.exercise_count + added.exercise_count
+        score_total = UserTopic.score_total + added.score_total
+        # MySQL assigns left to right and later ones see the new values,
+        # correct_percentage goes first so it reads the old totals on both dialects
+        values = [
+            ("correct_percentage", case((exercise_count > 0, score_total * 1.0 / exercise_count), else_=0.0)),
+            ("set_count", UserTopic.set_count + added.set_count),
+            ("exercise_count", exercise_count),
+            ("score_total", score_total),
+        ]
+        if dialect == "mysql":
+            return stmt.on_duplicate_key_update(values)
+        return stmt.on_conflict_do_update(index_elements=["user_id", "course_id", "topic_id"], set_=dict(values))
+
+
+    @staticmethod
+    def _score_exercise_set(submission: ExerciseSetResult) -> ExerciseResultResponse:
+        total_score = sum(result.score for result in submission.result)
+        average_score = total_score / len(submission.result) if submission.result else 0.0
+        return CourseService.ExerciseResultResponse(
+            exercise_set_id=submission.exercise_set_id,
             correct_percentage=average_score
         )
 
-        return response
 
-
-    def _create_exercise_set(self, user_id: int, course_id: int, topic_id: int, lesson_type: str) -> ExerciseSet:
+    def _create_exercise_set(self, user_id: int, course_id: int, topic_id: int, lesson_type: str,
+                             lesson_content_id: int | None = None) -> ExerciseSet:
         exercise_set = ExerciseSet(
             user_id=user_id,
             course_id=course_id,
             topic_id=topic_id,
+            lesson_content_id=lesson_content_id,
             exercise_type=lesson_type,
             exercise_count=0,
             correct_percentage=0.0
@@ -338,16 +723,13 @@ class CourseService:
         if not user:
             logger.info(f"Can't find user {request.user_uuid}")
             raise HTTPException(status_code=400, detail="Bad Request")
-        agent = ListeningGeneratorAgent()
-        prompt = ListeningGeneratorAgent.build_listening_prompt(
-            topic=request.topic,
-            actfl_level=request.actfl_level,
-            target_language=request.target_language
-        )
+        params = {"topic": request.topic, "actfl_level": request.actfl_level, "target_language": request.target_language}
+        pool = ExercisePool.instance()
+        item = pool.take("listening", params) if pool is not None else None
+        if item is not None:
+            return CourseService.ListeningGenerateResponse(**item)
         try:
-            response = agent.ask_ai(prompt)
-            data = json.loads(response)
-            return CourseService.ListeningGenerateResponse(**data)
+            return CourseService.create_listening_exercise(**params)
         except Exception as e:
             logger.error(f"Error generating listening lesson: {e}")
             raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -358,17 +740,56 @@ class CourseService:
         if not user:
             logger.info(f"Can't find user {request.user_uuid}")
             raise HTTPException(status_code=400, detail="Bad Request")
-        agent = WritingGeneratorAgent()
-        prompt = WritingGeneratorAgent.build_writing_prompt(
-            target_language=request.target_language,
-            instruction_language=request.learning_language,
-            topic=request.topic,
-            actfl_level=request.actfl_level
-        )
+        params = {"target_language": request.target_language, "learning_language": request.learning_language,
+                  "topic": request.topic, "actfl_level": request.actfl_level}
+        pool = ExercisePool.instance()
+        item = pool.take("writing", params) if pool is not None else None
+        if item is not None:
+            return CourseService.WritingGenerateResponse(**item)
         try:
-            response = agent.ask_ai(prompt)
-            data = json.loads(response)
-            return CourseService.WritingGenerateResponse(**data)
+            return CourseService.create_writing_exercise(**params)
         except Exception as e:
             logger.error(f"Error generating writing prompt: {e}")
             raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+    @staticmethod
+    def _parse_listening(response: str) -> ListeningGenerateResponse:
+        return CourseService.ListeningGenerateResponse(**json.loads(response))
+
+
+    @staticmethod
+    def _parse_writing(response: str) -> WritingGenerateResponse:
+        return CourseService.WritingGenerateResponse(**json.loads(response))
+
+
+    @staticmethod
+    def create_listening_exercise(topic: str, actfl_level: str, target_language: str) -> ListeningGenerateResponse:
+        prompt = ListeningGeneratorAgent.build_listening_prompt(topic=topic, actfl_level=actfl_level, target_language=target_language)
+        response = ListeningGeneratorAgent(validate=CourseService._parse_listening).ask_ai(prompt)
+        return CourseService._parse_listening(response)
+
+
+    @staticmethod
+    async def create_listening_exercise_async(topic: str, actfl_level: str, target_language: str,
+                                              cached: bool = True) -> ListeningGenerateResponse:
+        prompt = ListeningGeneratorAgent.build_listening_prompt(topic=topic, actfl_level=actfl_level, target_language=target_language)
+        response = await ListeningGeneratorAgent(validate=CourseService._parse_listening, cached=cached).ask_ai_async(prompt)
+        return CourseService._parse_listening(response)
+
+
+    @staticmethod
+    def create_writing_exercise(target_language: str, learning_language: str, topic: str, actfl_level: str) -> WritingGenerateResponse:
+        prompt = WritingGeneratorAgent.build_writing_prompt(target_language=target_language, instruction_language=learning_language,
+                                                            topic=topic, actfl_level=actfl_level)
+        response = WritingGeneratorAgent(validate=CourseService._parse_writing).ask_ai(prompt)
+        return CourseService._parse_writing(response)
+
+
+    @staticmethod
+    async def create_writing_exercise_async(target_language: str, learning_language: str, topic: str, actfl_level: str,
+                                            cached: bool = True) -> WritingGenerateResponse:
+        prompt = WritingGeneratorAgent.build_writing_prompt(target_language=target_language, instruction_language=learning_language,
+                                                            topic=topic, actfl_level=actfl_level)
+        response = await WritingGeneratorAgent(validate=CourseService._parse_writing, cached=cached).ask_ai_async(prompt)
+        return CourseService._parse_writing(response)
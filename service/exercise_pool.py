@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+
+from utils import get_app_logger, get_redis
+
+logger = get_app_logger(__name__)
+
+
+class InMemoryExerciseQueue:
+    def __init__(self):
+        self._items: dict[str, deque] = {}
+        self._refilling: set[str] = set()
+        self._lock = threading.Lock()
+
+
+    def push(self, key: str, item: dict, max_size: int):
+        with self._lock:
+            items = self._items.setdefault(key, deque())
+            if len(items) < max_size:
+                items.append(item)
+
+
+    def pop(self, key: str) -> dict | None:
+        with self._lock:
+            items = self._items.get(key)
+            return items.popleft() if items else None
+
+
+    def size(self, key: str) -> int:
+        with self._lock:
+            return len(self._items.get(key, ()))
+
+
+    def clear(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+    def acquire_refill(self, key: str, ttl: float) -> bool:
+        with self._lock:
+            if key in self._refilling:
+                return False
+            self._refilling.add(key)
+            return True
+
+
+    def release_refill(self, key: str):
+        with self._lock:
+            self._refilling.discard(key)
+
+
+class RedisExerciseQueue:
+    """
+    One Redis list per exercise key, every worker serves from the same pool.
+    A worker refills a key only while it holds the key's refill lock, lists
+    are capped at the pool's high water and expire when nobody refills them.
+    """
+    KEY_PREFIX = "exercise_pool"
+    LOCK_PREFIX = "exercise_pool_refill"
+
+    def __init__(self, ttl: float = 3600.0):
+        self.redis = get_redis()
+        self.ttl = ttl
+
+
+    def push(self, key: str, item: dict, max_size: int):
+        name = f"{self.KEY_PREFIX}:{key}"
+        with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(name, json.dumps(item, ensure_ascii=False))
+            pipe.ltrim(name, 0, max_size - 1)
+            pipe.expire(name, int(self.ttl))
+            pipe.execute()
+
+
+    def pop(self, key: str) -> dict | None:
+        value = self.redis.lpop(f"{self.KEY_PREFIX}:{key}")
+        return json.loads(value) if value is not None else None
+
+
+    def size(self, key: str) -> int:
+        return self.redis.llen(f"{self.KEY_PREFIX}:{key}")
+
+
+    def clear(self, key: str):
+        self.redis.delete(f"{self.KEY_PREFIX}:{key}")
+
+
+    def acquire_refill(self, key: str, ttl: float) -> bool:
+        # expires on its own if the worker dies mid-refill
+        return bool(self.redis.set(f"{self.LOCK_PREFIX}:{key}", 1, nx=True, px=int(ttl * 1000)))
+
+
+    def release_refill(self, key: str):
+        self.redis.delete(f"{self.LOCK_PREFIX}:{key}")
+
+
+class ExercisePool:
+    """
+    Pre-generated listening and writing exercises, so the generate endpoints
+    answer without waiting for the LLM. Every request counts towards the demand
+    of its (kind, parameters) key. Keys requested at least min_demand times are
+    popular, a background task tops their pools up to high_water once they drop
+    below low_water. Demand halves every refill cycle, keys nobody asks for any
+    more fall out and their pools are cleared. A key is refilled by one worker
+    at a time, under a lock that expires after refill_lock_ttl seconds.
+    Enabled with EXERCISE_POOL=memory|redis.
+    """
+    _instance = None
+
+
+    def __init__(self, queue, low_water: int = 3, high_water: int = 10, refill_interval: float = 30.0,
+                 concurrency: int = 4, max_keys: int = 100, min_demand: int = 2, refill_lock_ttl: float = 300.0):
+        self.queue = queue
+        self.low_water = low_water
+        self.high_water = high_water
+        self.refill_interval = refill_interval
+        self.concurrency = concurrency
+        self.max_keys = max_keys
+        self.min_demand = min_demand
+        self.refill_lock_ttl = refill_lock_ttl
+        # key -> [kind, params, demand]
+        self._demand: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+
+
+    @classmethod
+    def instance(cls) -> "ExercisePool | None":
+        return cls._instance
+
+
+    @classmethod
+    def configure_from_env(cls) -> "ExercisePool | None":
+        mode = os.getenv("EXERCISE_POOL", "off").lower()
+        if mode == "off":
+            cls._instance = None
+            return None
+
+        if mode == "redis":
+            queue = RedisExerciseQueue(ttl=float(os.getenv("EXERCISE_POOL_TTL", "3600")))
+        elif mode == "memory":
+            queue = InMemoryExerciseQueue()
+        else:
+            raise ValueError(f"Invalid EXERCISE_POOL mode {mode}")
+
+        cls._instance = cls(queue,
+            low_water=int(os.getenv("EXERCISE_POOL_LOW_WATER", "3")),
+            high_water=int(os.getenv("EXERCISE_POOL_HIGH_WATER", "10")),
+            refill_interval=float(os.getenv("EXERCISE_POOL_REFILL_INTERVAL", "30")),
+            concurrency=int(os.getenv("EXERCISE_POOL_CONCURRENCY", "4")),
+            max_keys=int(os.getenv("EXERCISE_POOL_MAX_KEYS", "100")),
+            min_demand=int(os.getenv("EXERCISE_POOL_MIN_DEMAND", "2")),
+            refill_lock_ttl=float(os.getenv("EXERCISE_POOL_REFILL_LOCK_TTL", "300")))
+        logger.info(f"exercise pre-generation pool enabled ({mode})")
+        return cls._instance
+
+
+    def take(self, kind: str, params: dict) -> dict | None:
+        """
+        Pops a pre-generated exercise, None when the caller has to generate inline.
+        """
+        key = ExercisePool._key(kind, params)
+        with self._lock:
+            entry = self._demand.get(key)
+            if entry is None:
+                entry = self._demand[key] = [kind, params, 0]
+            entry[2] += 1
+
+        item = self.queue.pop(key)
+        if item is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self._wakeup is not None and (item is None or self.queue.size(key) < self.low_water):
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return item
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = {key: {"demand": entry[2], "size": self.queue.size(key)} for key, entry in self._demand.items()}
+        return {"hits": self.hits, "misses": self.misses, "generated": self.generated,
+                "failures": self.failures, "keys": keys}
+
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+    async def refill(self) -> int:
+        """
+        Tops up the pools of the popular keys below low_water, returns the number
+        of exercises generated. Keys another worker is refilling are skipped.
+        """
+        jobs, locked = [], []
+        try:
+            for key, kind, params in self._popular_keys():
+                if await asyncio.to_thread(self.queue.size, key) >= self.low_water:
+                    continue
+                if not await asyncio.to_thread(self.queue.acquire_refill, key, self.refill_lock_ttl):
+                    continue
+                locked.append(key)
+                # sized under the lock, another worker may have just topped it up
+                size = await asyncio.to_thread(self.queue.size, key)
+                if size < self.low_water:
+                    jobs += [(key, kind, params)] * (self.high_water - size)
+            if not jobs:
+                return 0
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def generate(key: str, kind: str, params: dict) -> bool:
+                async with semaphore:
+                    try:
+                        item = await ExercisePool._generate(kind, params)
+                    except Exception as e:
+                        self.failures += 1
+                        logger.error(f"Error pre-generating {kind} exercise {params}: {e}")
+                        return False
+                    await asyncio.to_thread(self.queue.push, key, item, self.high_water)
+                    self.generated += 1
+                    return True
+
+            results = await asyncio.gather(*(generate(*job) for job in jobs))
+            logger.info(f"pre-generated {sum(results)} of {len(jobs)} exercises")
+            return sum(results)
+        finally:
+            for key in locked:
+                await asyncio.to_thread(self.queue.release_refill, key)
+
+
+    async def _run(self):
+        last_decay = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.error(f"Error refilling exercise pool: {e}")
+            if time.monotonic() - last_decay >= self.refill_interval:
+                await asyncio.to_thread(self._decay)
+                last_decay = time.monotonic()
+
+
+    def _popular_keys(self) -> list[tuple[str, str, dict]]:
+        with self._lock:
+            ranked = sorted(self._demand.items(), key=lambda item: item[1][2], reverse=True)
+            return [(key, kind, params) for key, (kind, params, demand) in ranked[:self.max_keys]
+                    if demand >= self.min_demand]
+
+
+    def _decay(self):
+        """
+        Halves the demand of every key, clears the pools of the keys that fell out.
+        """
+        dropped = []
+        with self._lock:
+            for key in list(self._demand):
+                self._demand[key][2] //= 2
+                if self._demand[key][2] == 0:
+                    del self._demand[key]
+                    dropped.append(key)
+            # unpopular keys beyond max_keys are not worth tracking
+            if len(self._demand) > self.max_keys * 10:
+                ranked = sorted(self._demand, key=lambda key: self._demand[key][2], reverse=True)
+                for key in ranked[self.max_keys * 10:]:
+                    del self._demand[key]
+                    dropped.append(key)
+        for key in dropped:
+            self.queue.clear(key)
+
+
+    @staticmethod
+    async def _generate(kind: str, params: dict) -> dict:
+        from .course_service import CourseService
+
+        # the LLM response cache would hand the pool copies of the same few answers,
+        # refills always ask the LLM so pooled exercises differ
+        if kind == "listening":
+            exercise = await CourseService.create_listening_exercise_async(**params, cached=False)
+        elif kind == "writing":
+            exercise = await CourseService.create_writing_exercise_async(**params, cached=False)
+        else:
+            raise ValueError(f"Unknown exercise kind {kind}")
+        return exercise.model_dump()
+
+
+    @staticmethod
+    def _key(kind: str, params: dict) -> str:
+        return kind + ":" + json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,230 @@
+import os
+import json
+import asyncio
+import threading
+from collections import deque
+from sqlmodel import Session
+
+from db import database
+from utils import get_app_logger, get_redis
+
+logger = get_app_logger(__name__)
+
+
+class InMemoryResultQueue:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = deque()
+        self._lock = threading.Lock()
+
+
+    def push(self, items: list[dict]) -> bool:
+        """
+        Appends all items or, when they don't fit, none of them.
+        """
+        with self._lock:
+            if len(self._items) + len(items) > self.max_size:
+                return False
+            self._items.extend(items)
+            return True
+
+
+    def push_front(self, items: list[dict]):
+        with self._lock:
+            self._items.extendleft(reversed(items))
+
+
+    def pop_batch(self, count: int) -> list[dict]:
+        with self._lock:
+            return [self._items.popleft() for _ in range(min(count, len(self._items)))]
+
+
+    def size(self) -> int:
+        return len(self._items)
+
+
+class RedisResultQueue:
+    """
+    Pending results in a Redis list, so they survive a worker restart and every
+    worker can flush them.
+    """
+    KEY = "exercise_result_buffer"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.redis = get_redis()
+
+
+    def push(self, items: list[dict]) -> bool:
+        # max_size is a soft bound, workers pushing together may overshoot it a little
+        if self.redis.llen(self.KEY) + len(items) > self.max_size:
+            return False
+        self.redis.rpush(self.KEY, *(json.dumps(item) for item in items))
+        return True
+
+
+    def push_front(self, items: list[dict]):
+        self.redis.lpush(self.KEY, *(json.dumps(item) for item in reversed(items)))
+
+
+    def pop_batch(self, count: int) -> list[dict]:
+        values = self.redis.lpop(self.KEY, count) or []
+        return [json.loads(value) for value in values]
+
+
+    def size(self) -> int:
+        return self.redis.llen(self.KEY)
+
+
+class ExerciseResultBuffer:
+    """
+    Write-behind buffer for CourseService.submit_exercise_result. Submissions are
+    queued after the ownership check and a background task writes them in batches
+    when flush_size are pending or every flush_interval seconds. A request that
+    doesn't fit in a full buffer is refused rather than written inline.
+    Enabled with EXERCISE_RESULT_WRITE_BEHIND=memory|redis.
+    """
+    MAX_ATTEMPTS = 3
+    _instance = None
+
+
+    def __init__(self, queue, flush_size: int = 200, flush_interval: float = 2.0):
+        self.queue = queue
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+
+
+    @classmethod
+    def instance(cls) -> "ExerciseResultBuffer | None":
+        return cls._instance
+
+
+    @classmethod
+    def configure_from_env(cls) -> "ExerciseResultBuffer | None":
+        mode = os.getenv("EXERCISE_RESULT_WRITE_BEHIND", "off").lower()
+        if mode == "off":
+            cls._instance = None
+            return None
+
+        max_size = int(os.getenv("EXERCISE_RESULT_BUFFER_SIZE", "10000"))
+        if mode == "redis":
+            queue = RedisResultQueue(max_size)
+        elif mode == "memory":
+            queue = InMemoryResultQueue(max_size)
+        else:
+            raise ValueError(f"Invalid EXERCISE_RESULT_WRITE_BEHIND mode {mode}")
+
+        cls._instance = cls(queue,
+            flush_size=int(os.getenv("EXERCISE_RESULT_FLUSH_SIZE", "200")),
+            flush_interval=float(os.getenv("EXERCISE_RESULT_FLUSH_INTERVAL", "2.0")))
+        logger.info(f"exercise result write-behind enabled ({mode})")
+        return cls._instance
+
+
+    def offer(self, user_uuid: str, submissions: list[tuple[int, list[dict]]]) -> bool:
+        """
+        Queues the (exercise_set_id, results) submissions of one request, all or
+        none. Returns False when the buffer is full, the caller has to back off.
+        """
+        items = [{"user_uuid": user_uuid, "exercise_set_id": exercise_set_id, "result": results, "attempts": 0}
+                 for exercise_set_id, results in submissions]
+        if not self.queue.push(items):
+            logger.warning(f"exercise result buffer is full, rejecting {len(items)} submissions of user {user_uuid}")
+            return False
+
+        if self._wakeup is not None and self.queue.size() >= self.flush_size:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # whatever is still pending goes out before the engine is disposed
+        await asyncio.to_thread(self.flush)
+
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Error flushing exercise results: {e}")
+
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                items = self.queue.pop_batch(self.flush_size)
+                if not items:
+                    return written
+                count = self._write_batch(items)
+                written += count
+                if count < len(items):
+                    # the failed items went back to the head of the queue, retry them on the next flush
+                    return written
+
+
+    def _write_batch(self, items: list[dict]) -> int:
+        """
+        Writes items in one transaction, returns how many were written. When the
+        batch fails each item is retried on its own, so one bad row doesn't hold
+        back the others. Failed items go back to the head of the queue together
+        with the later items of their sets, which must not be written before them.
+        """
+        try:
+            ExerciseResultBuffer._write(items)
+            return len(items)
+        except Exception as e:
+            logger.error(f"Error writing {len(items)} buffered exercise results, retrying one by one: {e}")
+
+        written = 0
+        retry = []
+        failed_sets = set()
+        for item in items:
+            if item["exercise_set_id"] in failed_sets:
+                retry.append(item)
+                continue
+            try:
+                ExerciseResultBuffer._write([item])
+                written += 1
+            except Exception as e:
+                logger.error(f"Error writing buffered results of exercise set id={item['exercise_set_id']}: {e}")
+                item["attempts"] += 1
+                if item["attempts"] >= ExerciseResultBuffer.MAX_ATTEMPTS:
+                    logger.error(f"Dropping buffered results of exercise set id={item['exercise_set_id']}")
+                    continue
+                failed_sets.add(item["exercise_set_id"])
+                retry.append(item)
+        if retry:
+            self.queue.push_front(retry)
+        return written
+
+
+    @staticmethod
+    def _write(items: list[dict]):
+        from .course_service import CourseService
+
+        with Session(database.engine) as session:
+            CourseService(session=session).write_buffered_results(items)
@@ -0,0 +1,105 @@
+import os
+import random
+import re
+from pydantic import BaseModel
+from sqlmodel import Session, update
+
+from db import database
+from db.load_profiles import reusable_lessons_statement, exercise_set_content_statement
+from entity import ExerciseSet, LessonContent
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class LessonContentService:
+    """
+    Stored speaking lessons. A new exercise set replays a stored lesson of the
+    same (subject, level, instruction language, topic) with probability
+    LESSON_REUSE_RATIO, picking among the LESSON_REUSE_CANDIDATES least used
+    ones the user hasn't had. Otherwise the LLM generates a new lesson, which
+    is stored once its stream completes and parses into the expected number
+    of exercises.
+    """
+    REPLAY_CHUNK_SIZE = 8192
+    EXERCISE_NUMBER = re.compile(r"^\s*(\d+)\.(.*)$")
+
+    class LessonKey(BaseModel):
+        subject_id: int
+        subject_level_id: int
+        instruction_language_id: int
+        topic_id: int
+        exercise_count: int
+
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.reuse_ratio = float(os.getenv("LESSON_REUSE_RATIO", "0.5"))
+        self.candidates = int(os.getenv("LESSON_REUSE_CANDIDATES", "5"))
+
+
+    def find_reusable(self, user_id: int, key: LessonKey) -> LessonContent | None:
+        """
+        A stored lesson to replay or None, counts the use in the current transaction.
+        """
+        if random.random() >= self.reuse_ratio:
+            return None
+        lessons = self.session.exec(reusable_lessons_statement(user_id=user_id, limit=self.candidates, **key.model_dump())).all()
+        if not lessons:
+            return None
+        lesson = random.choice(lessons)
+        self.session.exec(
+            update(LessonContent)
+            .where(LessonContent.id == lesson.id)
+            .values(use_count=LessonContent.use_count + 1)
+        )
+        return lesson
+
+
+    def get_exercise_set(self, user_id: int, exercise_set_id: int) -> tuple[ExerciseSet, LessonContent | None] | None:
+        return self.session.exec(exercise_set_content_statement(user_id, exercise_set_id)).first()
+
+
+    @staticmethod
+    def save(key: LessonKey, content: str, exercise_set_id: int):
+        """
+        Stores a generated lesson and links it to its exercise set. Runs after the
+        stream, the request session is closed by then.
+        """
+        with Session(database.engine) as session:
+            lesson = LessonContent(content=content, **key.model_dump())
+            session.add(lesson)
+            session.flush()
+            session.exec(update(ExerciseSet).where(ExerciseSet.id == exercise_set_id).values(lesson_content_id=lesson.id))
+            session.commit()
+            logger.debug(f"stored lesson content id={lesson.id} of exercise set id={exercise_set_id}")
+
+
+    @staticmethod
+    def is_complete(content: str, exercise_count: int) -> bool:
+        """
+        Whether a generated lesson has the exercises 1 to exercise_count, each with
+        a tab separated pronunciation line followed by its translation. A truncated
+        or malformed answer fails this and is not stored.
+        """
+        numbers, exercises = [], []
+        for line in content.splitlines():
+            match = LessonContentService.EXERCISE_NUMBER.match(line)
+            if match:
+                numbers.append(int(match.group(1)))
+                exercises.append([match.group(2)] if match.group(2).strip() else [])
+            elif exercises and line.strip():
+                exercises[-1].append(line)
+        if numbers != list(range(1, exercise_count + 1)):
+            return False
+        for lines in exercises:
+            tabbed = [i for i, line in enumerate(lines) if "\t" in line]
+            if not tabbed or not any(line.strip() and "\t" not in line for line in lines[tabbed[0] + 1:]):
+                return False
+        return True
+
+
+    @staticmethod
+    def replay(content: str):
+        for start in range(0, len(content), LessonContentService.REPLAY_CHUNK_SIZE):
+            yield content[start:start + LessonContentService.REPLAY_CHUNK_SIZE]
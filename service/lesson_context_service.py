@@ -0,0 +1,111 @@
+from pydantic import BaseModel
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.load_profiles import course_context_statement
+from .cache_service import CacheService
+from .catalog_service import Catalog, CatalogService
+from utils import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class LessonContextService:
+    """
+    Ids of a user's enrolled course, cached per (user_uuid, course_id) so lesson
+    and tutor requests don't hit the database. The reference rows are resolved
+    from the Catalog on every call, a catalog refresh applies immediately.
+    Entries are dropped by CourseService when the user course changes.
+    """
+    CACHE_NAMESPACE = "lesson_context"
+
+    class LessonContext(BaseModel):
+        user_id: int
+        course_id: int
+        subject_id: int
+        level_id: int
+        tutor_id: int
+        instruction_language_id: int
+
+    class ResolvedContext:
+        def __init__(self, context: "LessonContextService.LessonContext", catalog: Catalog):
+            self.context = context
+            self.subject = catalog.subjects_by_id.get(context.subject_id)
+            self.level = catalog.levels_by_id.get(context.level_id)
+            self.tutor = catalog.tutors_by_id.get(context.tutor_id)
+            self.inst_lang = catalog.instruction_languages_by_id.get(context.instruction_language_id)
+
+
+        @property
+        def subject_code(self) -> str:
+            return self.subject.code.split("-")[0]
+
+
+        @property
+        def inst_lang_code(self) -> str:
+            return self.inst_lang.code.split("-")[0]
+
+
+        def missing(self) -> str | None:
+            """
+            Description of the first reference row missing from the catalog.
+            """
+            ctx = self.context
+            for value, message in ((self.subject, f"Subject id {ctx.subject_id} not found."),
+                                   (self.level, f"Subject level id {ctx.level_id} not found."),
+                                   (self.inst_lang, f"Instruction language id {ctx.instruction_language_id} not found."),
+                                   (self.tutor, f"Tutor id {ctx.tutor_id} not found.")):
+                if value is None:
+                    return message
+            return None
+
+
+    def __init__(self, session: Session | AsyncSession):
+        self.session = session
+        self.catalog_service = CatalogService(session=session)
+
+
+    def get_context(self, user_uuid: str, course_id: int) -> ResolvedContext | None:
+        cache = CacheService()
+        context = cache.get(LessonContextService._key(user_uuid, course_id), namespace=LessonContextService.CACHE_NAMESPACE)
+        if context is None:
+            row = self.session.exec(course_context_statement(user_uuid, course_id)).first()
+            context = LessonContextService._store(user_uuid, course_id, row)
+        return LessonContextService.ResolvedContext(context, self.catalog_service.get_catalog()) if context else None
+
+
+    async def get_context_async(self, user_uuid: str, course_id: int) -> ResolvedContext | None:
+        cache = CacheService()
+        context = cache.get(LessonContextService._key(user_uuid, course_id), namespace=LessonContextService.CACHE_NAMESPACE)
+        if context is None:
+            row = (await self.session.exec(course_context_statement(user_uuid, course_id))).first()
+            context = LessonContextService._store(user_uuid, course_id, row)
+        return LessonContextService.ResolvedContext(context, await self.catalog_service.get_catalog_async()) if context else None
+
+
+    @staticmethod
+    def invalidate(user_uuid: str, course_id: int):
+        CacheService().invalidate(LessonContextService._key(user_uuid, course_id), namespace=LessonContextService.CACHE_NAMESPACE)
+
+
+    @staticmethod
+    def _key(user_uuid: str, course_id: int) -> str:
+        return f"{user_uuid}:{course_id}"
+
+
+    @staticmethod
+    def _store(user_uuid: str, course_id: int, row) -> LessonContext | None:
+        # unknown courses are not cached, the row may be added any time
+        if row is None:
+            return None
+        user, user_course, course = row
+        context = LessonContextService.LessonContext(
+            user_id=user.id,
+            course_id=course.id,
+            subject_id=course.subject_id,
+            level_id=course.subject_level_id,
+            tutor_id=user_course.tutor_id,
+            instruction_language_id=user_course.instruction_language_id
+        )
+        CacheService().set(LessonContextService._key(user_uuid, course_id), context, namespace=LessonContextService.CACHE_NAMESPACE)
+        return context
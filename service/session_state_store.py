@@ -0,0 +1,211 @@
+import os
+import time
+import threading
+
+from redis.exceptions import WatchError
+
+from agent import BaseTutorAgent
+from utils import get_app_logger, get_redis, get_async_redis, TopKSketch
+
+logger = get_app_logger(__name__)
+
+
+class RedisSessionBackend:
+    """
+    Session states as Redis hashes. An update is one MULTI transaction of
+    HINCRBY / HSET, PEXPIRE and HGETALL, so concurrent turns of the same
+    learner add up instead of overwriting each other. Read-modify-write
+    updates WATCH the key and retry when another turn changed it first.
+    """
+    def apply(self, key: str, increments: dict[str, int], values: dict[str, str], ttl: float) -> dict[bytes, bytes]:
+        with get_redis().pipeline(transaction=True) as pipe:
+            RedisSessionBackend._queue(pipe, key, increments, values, ttl)
+            return pipe.execute()[-1]
+
+
+    async def apply_async(self, key: str, increments: dict[str, int], values: dict[str, str], ttl: float) -> dict[bytes, bytes]:
+        async with get_async_redis().pipeline(transaction=True) as pipe:
+            RedisSessionBackend._queue(pipe, key, increments, values, ttl)
+            return (await pipe.execute())[-1]
+
+
+    def update(self, key: str, fields: list[str], modify, ttl: float) -> dict[bytes, bytes]:
+        """
+        Sets the fields to modify({field: current bytes or None}) -> {field: value}.
+        """
+        with get_redis().pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    current = dict(zip(fields, pipe.hmget(key, fields)))
+                    values = modify(current)
+                    pipe.multi()
+                    RedisSessionBackend._queue(pipe, key, {}, values, ttl)
+                    return pipe.execute()[-1]
+                except WatchError:
+                    logger.debug(f"{key} changed during update, retrying")
+
+
+    def delete(self, key: str):
+        get_redis().delete(key)
+
+
+    @staticmethod
+    def _queue(pipe, key: str, increments: dict[str, int], values: dict[str, str], ttl: float):
+        for field, delta in increments.items():
+            pipe.hincrby(key, field, delta)
+        if values:
+            pipe.hset(key, mapping=values)
+        pipe.pexpire(key, int(ttl * 1000))
+        pipe.hgetall(key)
+
+
+class InMemorySessionBackend:
+    """
+    Local stand-in for RedisSessionBackend, for tests and runs without Redis.
+    """
+    _store: dict[str, tuple[dict[bytes, bytes], float]] = {}
+    _lock = threading.RLock()
+
+    def apply(self, key: str, increments: dict[str, int], values: dict[str, str], ttl: float) -> dict[bytes, bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._store.get(key)
+            fields = dict(entry[0]) if entry is not None and entry[1] > now else {}
+            for field, delta in increments.items():
+                field = field.encode()
+                fields[field] = str(int(fields.get(field, b"0")) + delta).encode()
+            for field, value in values.items():
+                fields[field.encode()] = value if isinstance(value, bytes) else str(value).encode()
+            self._store[key] = (fields, now + ttl)
+            return dict(fields)
+
+
+    def update(self, key: str, fields: list[str], modify, ttl: float) -> dict[bytes, bytes]:
+        with self._lock:
+            entry = self._store.get(key)
+            stored = entry[0] if entry is not None and entry[1] > time.monotonic() else {}
+            values = modify({field: stored.get(field.encode()) for field in fields})
+            return self.apply(key, {}, values, ttl)
+
+
+    async def apply_async(self, key: str, increments: dict[str, int], values: dict[str, str], ttl: float) -> dict[bytes, bytes]:
+        return self.apply(key, increments, values, ttl)
+
+
+    def delete(self, key: str):
+        with self._lock:
+            self._store.pop(key, None)
+
+
+class TutorSessionStore:
+    """
+    Tutor session state per (user_uuid, course_id), kept in a hash under
+    tutor_session:<user_uuid>:<course_id>. Every read or update slides the
+    expiry forward by TUTOR_SESSION_TTL seconds, idle sessions are dropped.
+
+    Fields have short names. The counters are plain numbers that change in place
+    with HINCRBY. The tallies are fixed-size TopKSketch blobs, updated
+    optimistically:
+        e   consecutive errors
+        c   last confidence
+        g   weak grammar sketch
+        v   weak vocabulary sketch
+    """
+    KEY_PREFIX = "tutor_session"
+    DEFAULT_TTL = 7 * 24 * 3600
+    DEFAULT_WEAK_HALF_LIFE = 14 * 24 * 3600
+    # modes a learner gets when the previous answer went wrong
+    ERROR_MODES = ("correction", "repetition", "explanation")
+
+    def __init__(self, backend: str | None = None, ttl: float | None = None):
+        backend = (backend or os.getenv("SESSION_STORE_BACKEND", "redis")).lower()
+        if backend == "redis":
+            self.backend = RedisSessionBackend()
+        elif backend == "memory":
+            self.backend = InMemorySessionBackend()
+        else:
+            raise ValueError(f"Invalid SESSION_STORE_BACKEND {backend}")
+        self.ttl = ttl or float(os.getenv("TUTOR_SESSION_TTL", TutorSessionStore.DEFAULT_TTL))
+        self.weak_half_life = float(os.getenv("TUTOR_WEAK_HALF_LIFE", TutorSessionStore.DEFAULT_WEAK_HALF_LIFE))
+
+
+    def load(self, user_uuid: str, course_id: int) -> BaseTutorAgent.TutorSessionState:
+        return self._decode(user_uuid, course_id, self._apply(user_uuid, course_id, {}, {}))
+
+
+    async def load_async(self, user_uuid: str, course_id: int) -> BaseTutorAgent.TutorSessionState:
+        return self._decode(user_uuid, course_id, await self._apply_async(user_uuid, course_id, {}, {}))
+
+
+    def record_turn(self, user_uuid: str, course_id: int, mode: str) -> BaseTutorAgent.TutorSessionState:
+        """
+        Counts the turn towards consecutive_errors, any other mode resets it.
+        Returns the state after the update.
+        """
+        increments, values = TutorSessionStore._turn_update(mode)
+        return self._decode(user_uuid, course_id, self._apply(user_uuid, course_id, increments, values))
+
+
+    async def record_turn_async(self, user_uuid: str, course_id: int, mode: str) -> BaseTutorAgent.TutorSessionState:
+        increments, values = TutorSessionStore._turn_update(mode)
+        return self._decode(user_uuid, course_id, await self._apply_async(user_uuid, course_id, increments, values))
+
+
+    def record_weakness(self, user_uuid: str, course_id: int, grammar: list[str] = (), vocab: list[str] = (),
+                        confidence: float | None = None) -> BaseTutorAgent.TutorSessionState:
+        def modify(current: dict[str, bytes | None]) -> dict:
+            values = {"c": repr(confidence)} if confidence is not None else {}
+            for field, items in (("g", grammar), ("v", vocab)):
+                if items:
+                    sketch = self._sketch(current[field])
+                    for item in items:
+                        sketch.add(item)
+                    values[field] = sketch.to_bytes()
+            return values
+
+        fields = self.backend.update(TutorSessionStore._key(user_uuid, course_id), ["g", "v"], modify, self.ttl)
+        return self._decode(user_uuid, course_id, fields)
+
+
+    def delete(self, user_uuid: str, course_id: int):
+        self.backend.delete(TutorSessionStore._key(user_uuid, course_id))
+
+
+    def _apply(self, user_uuid: str, course_id: int, increments: dict, values: dict) -> dict[bytes, bytes]:
+        return self.backend.apply(TutorSessionStore._key(user_uuid, course_id), increments, values, self.ttl)
+
+
+    async def _apply_async(self, user_uuid: str, course_id: int, increments: dict, values: dict) -> dict[bytes, bytes]:
+        return await self.backend.apply_async(TutorSessionStore._key(user_uuid, course_id), increments, values, self.ttl)
+
+
+    def _sketch(self, data: bytes | None) -> TopKSketch:
+        return TopKSketch.from_bytes(data) if data else TopKSketch(half_life=self.weak_half_life)
+
+
+    @staticmethod
+    def _turn_update(mode: str) -> tuple[dict, dict]:
+        if mode in TutorSessionStore.ERROR_MODES:
+            return {"e": 1}, {}
+        return {}, {"e": "0"}
+
+
+    @staticmethod
+    def _key(user_uuid: str, course_id: int) -> str:
+        return f"{TutorSessionStore.KEY_PREFIX}:{user_uuid}:{course_id}"
+
+
+    @staticmethod
+    def _decode(user_uuid: str, course_id: int, fields: dict[bytes, bytes]) -> BaseTutorAgent.TutorSessionState:
+        state = BaseTutorAgent.TutorSessionState(user_uuid=user_uuid, course_id=course_id)
+        for field, value in fields.items():
+            if field == b"e":
+                state.consecutive_errors = int(value)
+            elif field == b"c":
+                state.last_confidence = float(value)
+            elif field == b"g":
+                state.weak_grammar = TopKSketch.from_bytes(value)
+            elif field == b"v":
+                state.weak_vocab = TopKSketch.from_bytes(value)
+        return state
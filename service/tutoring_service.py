@@ -1,18 +1,19 @@
 
 from __future__ import annotations
-import os
 import json
-import redis
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
 from fastapi import HTTPException
 from typing import List, Literal
 from requests_toolbelt.multipart import MultipartEncoder
-from sqlmodel import Session, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from agent import VoiceTutorAgent, TextTutorAgent, BaseTutorAgent
 from agent.client import OllamaClient, OpenAiClient, StubClient
 from entity import User, Subject, SubjectLevel, InstructionLanguage, Tutor
+from .lesson_context_service import LessonContextService
+from .session_state_store import TutorSessionStore
 from audio import TextToSpeech
 from utils import get_app_logger
 
@@ -34,6 +35,9 @@ class TutoringService:
     class AiResponse(BaseModel):
         question: List[TutoringService.AiResponseFragment]
         answer: List[TutoringService.AiResponseFragment]
+        weak_grammar: List[str] = []
+        weak_vocab: List[str] = []
+        confidence: float | None = None
 
     class TutorPolicy(BaseModel):
         response_mode: Literal[
@@ -50,31 +54,46 @@ class TutoringService:
         speech_speed: float
 
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session | AsyncSession):
         self.session = session
+        self.session_store = TutorSessionStore()
 
 
-    def askForTextResponse(self, request: AskTutorRequest):
+    async def resolveCourseInfoAsync(self, request: AskTutorRequest):
+        """
+        Course info for askForTextResponse / askForAudioResponse. Closes the session
+        afterwards, the LLM call that follows must not hold a pooled connection.
+        """
         try:
-            subj, level, inst_lang, tutor, ai_request = self._getCourseInfo(request)
-            session_state = self._get_or_create_session_state(user_uuid=request.user_uuid, course_id=request.course_id)
+            return await self._getCourseInfoAsync(request)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        finally:
+            await self.session.close()
+
+
+    async def askForTextResponse(self, request: AskTutorRequest, course_info: tuple = None, session_state: BaseTutorAgent.TutorSessionState = None):
+        try:
+            subj, level, inst_lang, tutor, ai_request = course_info or self._getCourseInfo(request)
+            session_state = session_state or self._get_or_create_session_state(request)
             agent = TextTutorAgent(subject=subj, level=level, tutor=tutor, inst_lang=inst_lang, mode=request.mode, session_state=session_state)
         
-            for chunk in agent.ask_ai_stream(ai_request):
+            async for chunk in agent.ask_ai_stream_async(ai_request):
                 yield chunk
         except Exception as e:
             logger.error(f"Error processing QnA: {e}")
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-    def askForAudioResponse(self, request: "TutoringService.DualLangRequest"):
+    def askForAudioResponse(self, request: "TutoringService.DualLangRequest", course_info: tuple = None, session_state: BaseTutorAgent.TutorSessionState = None):
         try:
-            subj, level, inst_lang, tutor, ai_request = self._getCourseInfo(request)
-            session_state = self._get_or_create_session_state(user_uuid=request.user_uuid, course_id=request.course_id)
+            subj, level, inst_lang, tutor, ai_request = course_info or self._getCourseInfo(request)
+            session_state = session_state or self._get_or_create_session_state(request)
             agent = VoiceTutorAgent(subject=subj, level=level, tutor=tutor, inst_lang=inst_lang, mode=request.mode, session_state=session_state)
             result = agent.ask_ai(ai_request)
             logger.info(f"AI Answer: {result}")
             ai_result = TutoringService.AiResponse.model_validate_json(result)
+            self._record_weakness(request, ai_result)
             inst_lang_code = inst_lang.code.split("-")[0]
             subject_lang_code = subj.code.split("-")[0]
 
@@ -116,38 +135,44 @@ class TutoringService:
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+    def _record_weakness(self, request: AskTutorRequest, ai_result: AiResponse):
+        """
+        Adds the mistakes the tutor spotted to the session tallies, the next prompt
+        lists the most frequent ones. A store error doesn't fail the answer.
+        """
+        if not (ai_result.weak_grammar or ai_result.weak_vocab or ai_result.confidence is not None):
+            return
+        try:
+            self.session_store.record_weakness(request.user_uuid, request.course_id, grammar=ai_result.weak_grammar,
+                                               vocab=ai_result.weak_vocab, confidence=ai_result.confidence)
+        except Exception as e:
+            logger.error(f"Error recording weaknesses of user {request.user_uuid}: {e}")
+
+
     def _getCourseInfo(self, request: AskTutorRequest):
         logger.info(f"user_uuid={request.user_uuid} course_id={request.course_id}\n{request.text_1}\n{request.text_2}")
+        context = LessonContextService(session=self.session).get_context(request.user_uuid, request.course_id)
+        return self._build_course_info(request, context)
+
+
+    async def _getCourseInfoAsync(self, request: AskTutorRequest):
+        logger.info(f"user_uuid={request.user_uuid} course_id={request.course_id}\n{request.text_1}\n{request.text_2}")
+        context = await LessonContextService(session=self.session).get_context_async(request.user_uuid, request.course_id)
+        return self._build_course_info(request, context)
 
-        stmt = select(User).where(User.uuid == request.user_uuid)
-        user = self.session.exec(stmt).first()
-        if user is None:
-            raise ValueError(f"{request.user_uuid} user not found.")
 
-        course = next((c for c in user.courses if c.course_id == request.course_id), None)
-        if course is None:
+    def _build_course_info(self, request: AskTutorRequest, context: LessonContextService.ResolvedContext | None):
+        if context is None:
             raise ValueError(f"Course id {request.course_id} not found for user {request.user_uuid}.")
 
-        subj = self.session.get(Subject, course.course.subject_id)
-        if subj is None:
-            raise ValueError(f"Subject id {course.course.subject_id} not found.")
-        
-        level = self.session.get(SubjectLevel, course.course.subject_level_id)
-        if level is None:
-            raise ValueError(f"Subject level id {course.course.subject_level_id} not found.")
-        
-        inst_lang = self.session.get(InstructionLanguage, course.instruction_language_id)
-        if inst_lang is None:
-            raise ValueError(f"Instruction language id {course.instruction_language_id} not found.")
-        
-        tutor = self.session.get(Tutor, course.tutor_id)
-        if tutor is None:
-            raise ValueError(f"Tutor id {course.tutor_id} not found.")
-        
-        ai_request = '{"tts1:{"lang":"' + inst_lang.code.split("-")[0] + '","text":"' + request.text_1 + '"},"' + \
-                     '{tts2:{"lang":"' + subj.code.split("-")[0] + '","text":"' + request.text_2 + '"}}'
+        missing = context.missing()
+        if missing:
+            raise ValueError(missing)
+
+        ai_request = '{"tts1:{"lang":"' + context.inst_lang_code + '","text":"' + request.text_1 + '"},"' + \
+                     '{tts2:{"lang":"' + context.subject_code + '","text":"' + request.text_2 + '"}}'
 
-        return subj, level, inst_lang, tutor, ai_request
+        return context.subject, context.level, context.inst_lang, context.tutor, ai_request
 
 
     def _convertAiResult(self, inst_lang_code: str, fragments: List[TutoringService.AiResponseFragment]) -> str:
@@ -161,34 +186,9 @@ class TutoringService:
         return result
     
 
-    def _get_or_create_session_state(self, user_uuid: str, course_id: int) -> BaseTutorAgent.TutorSessionState:
-        session_state = self._get_from_dist_memory(key=f"tutor_session:{user_uuid}")
+    async def resolveSessionStateAsync(self, request: AskTutorRequest) -> BaseTutorAgent.TutorSessionState:
+        return await self.session_store.record_turn_async(request.user_uuid, request.course_id, request.mode)
 
-        if session_state == None:
-            session_state_obj = BaseTutorAgent.TutorSessionState(
-                user_uuid=user_uuid,
-                course_id=course_id
-            )
-            self._set_to_dist_memory(key=f"tutor_session:{user_uuid}", value=json.dumps(session_state_obj.model_dump()))
-            return session_state_obj
-        
-        return BaseTutorAgent.TutorSessionState.model_validate_json(session_state)
-    
-
-    def _get_from_dist_memory(self, key: str) -> str | None:
-        host = os.getenv("REDIS_HOST", "localhost")
-        port = int(os.getenv("REDIS_PORT", "6379"))
-        db = int(os.getenv("REDIS_DB", "0"))
-        r = redis.Redis(host=host, port=port, db=db)
-        value = r.get(key)
-        if value:
-            return value.decode('utf-8')
-        return None
-    
 
-    def _set_to_dist_memory(self, key: str, value: str):
-        host = os.getenv("REDIS_HOST", "localhost")
-        port = int(os.getenv("REDIS_PORT", "6379"))
-        db = int(os.getenv("REDIS_DB", "0"))
-        r = redis.Redis(host=host, port=port, db=db)
-        r.set(key, value)
+    def _get_or_create_session_state(self, request: AskTutorRequest) -> BaseTutorAgent.TutorSessionState:
+        return self.session_store.record_turn(request.user_uuid, request.course_id, request.mode)
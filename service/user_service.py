@@ -4,7 +4,9 @@ import time
 
 from utils import get_app_logger
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from entity import User, Device
+from db.load_profiles import load_profile
 from datetime import datetime, timezone
 
 logger = get_app_logger(__name__)
@@ -16,7 +18,7 @@ class UserService:
             self.device_uuid = device_uuid
 
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session | AsyncSession):
         self.session = session
 
     def generate_device_challenge(self, user: User) -> DeviceChallenge:
@@ -78,12 +80,21 @@ class UserService:
         return user
     
 
-    def get_user_by_uuid(self, uuid: str) -> User:
-        statement = select(User).where(User.uuid == uuid)
+    def get_user_by_uuid(self, uuid: str, profile: str = None) -> User:
+        statement = select(User).where(User.uuid == uuid).options(*load_profile(profile))
         result = self.session.exec(statement).first()
         if result == None:
             result = User()
         return result
+
+
+    async def get_user_by_uuid_async(self, uuid: str, profile: str = "user_courses") -> User:
+        # lazy loading is not available on an AsyncSession, relationships must come from the profile
+        statement = select(User).where(User.uuid == uuid).options(*load_profile(profile))
+        result = (await self.session.exec(statement)).first()
+        if result == None:
+            result = User()
+        return result
    
     
     def update_user(self, user):
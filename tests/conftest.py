@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from entity import User, UserCourse, Course, Subject, SubjectLevel, Tutor, InstructionLanguage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    SQLite database with one subject, level, tutor and instruction language,
+    and user u1 enrolled in courses 1 and 2.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/lingo.db")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.add(Subject(id=2, name="Spanish", code="es-MX", description="es", category_id=1))
+        session.add(SubjectLevel(id=1, subject_category_id=1, level=1, name="Novice Low", description="nl"))
+        session.add(Tutor(id=1, name="Ana", gender="F", url="", description="friendly"))
+        session.add(InstructionLanguage(id=1, name="English", code="en-US"))
+        session.add(User(id=1, uuid="u1", create_date=now, update_date=now))
+        session.add(Course(id=1, subject_id=2, subject_level_id=1))
+        session.add(Course(id=2, subject_id=2, subject_level_id=1))
+        session.commit()
+        session.add(UserCourse(user_id=1, course_id=1, tutor_id=1, instruction_language_id=1))
+        session.add(UserCourse(user_id=1, course_id=2, tutor_id=1, instruction_language_id=1))
+        session.commit()
+    yield engine
+    engine.dispose()
@@ -0,0 +1,137 @@
+import time
+import pickle
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from service import CacheService
+
+
+def test_lru_eviction_and_counters():
+    cache = CacheService()
+    cache.configure_namespace("test_lru", max_size=2)
+    cache.set("a", 1, namespace="test_lru")
+    cache.set("b", 2, namespace="test_lru")
+    assert cache.get("a", namespace="test_lru") == 1   # b is now the least recently used
+    cache.set("c", 3, namespace="test_lru")
+
+    assert not cache.contain("b", namespace="test_lru")
+    assert cache.get("b", namespace="test_lru") is None
+    assert cache.get("c", namespace="test_lru") == 3
+    stats = cache.stats()["test_lru"]
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+
+def test_ttl_and_invalidation():
+    cache = CacheService()
+    assert cache.add("levels_1", [1], ttl=0.05, namespace="test_ttl")
+    assert not cache.add("levels_1", [2], namespace="test_ttl")
+    cache.set("levels_2", [2], namespace="test_ttl")
+    cache.set("tutors", [3], namespace="test_ttl")
+
+    time.sleep(0.06)
+    assert cache.add("levels_1", [4], namespace="test_ttl")   # expired entries can be replaced
+    assert cache.invalidate_prefix("levels_", namespace="test_ttl") == 2
+    assert cache.invalidate("tutors", namespace="test_ttl")
+    assert cache.stats()["test_ttl"]["size"] == 0
+
+    # resizing a namespace keeps its ttl
+    cache.configure_namespace("test_ttl", ttl=0.05)
+    cache.configure_namespace("test_ttl", max_size=10)
+    cache.set("tutors", [3], namespace="test_ttl")
+    time.sleep(0.06)
+    assert cache.get("tutors", namespace="test_ttl") is None
+
+
+def test_second_tier_and_broadcast_invalidation():
+    cache = CacheService()
+    cache.configure_remote("memory")
+    try:
+        cache.set("subjects", ["es", "ja"], namespace="test_remote")
+        cache.clear("test_remote")
+        # a cold worker reads the shared tier
+        assert cache.get("subjects", namespace="test_remote") == ["es", "ja"]
+        assert cache.stats()["test_remote"]["remote_hits"] == 1
+
+        # another worker broadcasts an invalidation
+        other_worker = '{"origin": "other", "namespace": "test_remote", "key": null, "prefix": "sub"}'
+        cache.remote.delete("cache:test_remote:subjects")
+        cache.remote.publish(other_worker)
+        assert cache.get("subjects", namespace="test_remote") is None
+    finally:
+        cache.configure_remote("local")
+
+
+def test_local_copy_expires_with_shared_value():
+    cache = CacheService()
+    cache.configure_remote("memory")
+    try:
+        cache.set("topics", [1], ttl=0.05, namespace="test_remote_ttl")
+        cache.clear("test_remote_ttl")
+        time.sleep(0.03)
+        assert cache.get("topics", namespace="test_remote_ttl") == [1]
+        time.sleep(0.03)
+        cache.remote.delete("cache:test_remote_ttl:topics")
+        # the local copy got the remaining 20ms, not the namespace TTL
+        assert cache.get("topics", namespace="test_remote_ttl") is None
+    finally:
+        cache.configure_remote("local")
+
+
+def test_unsigned_shared_values_are_ignored():
+    cache = CacheService()
+    cache.configure_remote("memory")
+    try:
+        cache.remote.set("cache:test_signed:subjects", pickle.dumps(["es"]), None)
+        assert cache.get("subjects", namespace="test_signed") is None
+
+        cache.set("tutors", ["Ana"], namespace="test_signed")
+        signed = cache.remote.get("cache:test_signed:tutors")
+        cache.remote.set("cache:test_signed:subjects", signed, None)   # signed for another key
+        cache.clear("test_signed")
+        assert cache.get("subjects", namespace="test_signed") is None
+        assert cache.get("tutors", namespace="test_signed") == ["Ana"]
+    finally:
+        cache.configure_remote("local")
+
+
+def test_single_flight_loading():
+    cache = CacheService()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return ["es"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load("subjects", load, namespace="test_flight"), range(8)))
+    assert results == [["es"]] * 8 and len(calls) == 1
+
+    async def load_async():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["ja"]
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_load_async("tutors", load_async, namespace="test_flight") for _ in range(8)])
+
+    assert asyncio.run(run()) == [["ja"]] * 8 and len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_load():
+    cache = CacheService()
+
+    async def load_async():
+        await asyncio.sleep(0.05)
+        return ["ko"]
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load_async("levels", load_async, namespace="test_flight_cancel"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load_async("levels", load_async, namespace="test_flight_cancel"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == ["ko"]
+    assert cache.get("levels", namespace="test_flight_cancel") == ["ko"]
@@ -0,0 +1,112 @@
+import json
+import asyncio
+from langchain.schema import BaseMessage
+
+from agent.client import AiClient, CachingAiClient
+from agent.client.response_cache import MemoryResponseCache, DiskResponseCache
+
+
+class CountingClient(AiClient):
+    def __init__(self):
+        self.calls = 0
+
+    def ask_ai(self, messages: list[BaseMessage]) -> str:
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+MESSAGES = [BaseMessage(content="generator", type="system"), BaseMessage(content="topic: food", type="user")]
+
+
+def test_serves_variants_once_filled():
+    inner = CountingClient()
+    client = CachingAiClient(inner, name="test_variants", ttl=60, variants=2)
+    client.cache = MemoryResponseCache()
+
+    assert [client.ask_ai(MESSAGES) for _ in range(2)] == ["answer 1", "answer 2"]
+    assert {client.ask_ai(MESSAGES) for _ in range(20)} <= {"answer 1", "answer 2"}
+    assert inner.calls == 2
+
+    other = [MESSAGES[0], BaseMessage(content="topic: travel", type="user")]
+    assert client.ask_ai(other) == "answer 3"
+    assert CachingAiClient.stats_by_name()["test_variants"] == {"hits": 20, "misses": 3, "hit_rate": 0.87}
+
+
+def test_disk_cache_expires(tmp_path):
+    cache = DiskResponseCache(str(tmp_path))
+    cache.add("k", "hola", max_variants=2, ttl=60)
+    cache.add("k", "buenas", max_variants=2, ttl=60)
+    cache.add("k", "ignored", max_variants=2, ttl=60)
+    assert DiskResponseCache(str(tmp_path)).get("k") == ["hola", "buenas"]
+
+    cache.add("old", "adios", max_variants=1, ttl=-1)
+    assert cache.get("old") == []
+
+
+
+def test_memory_cache_restarts_expired_entry():
+    cache = MemoryResponseCache()
+    cache.add("k", "hola", max_variants=2, ttl=-1)
+    cache.add("k", "buenas", max_variants=2, ttl=60)
+    assert cache.get("k") == ["buenas"]
+
+
+class ScriptedClient(AiClient):
+    def __init__(self, answers: list[str]):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def ask_ai(self, messages: list[BaseMessage]) -> str:
+        self.calls += 1
+        return self.answers.pop(0)
+
+    def ask_ai_stream(self, messages: list[BaseMessage]):
+        answer = self.ask_ai(messages)
+        yield answer[:3]
+        yield answer[3:]
+
+    async def ask_ai_async(self, messages: list[BaseMessage]) -> str:
+        return self.ask_ai(messages)
+
+    async def ask_ai_stream_async(self, messages: list[BaseMessage]):
+        for chunk in self.ask_ai_stream(messages):
+            yield chunk
+
+
+def test_invalid_answers_are_not_cached():
+    inner = ScriptedClient(['{"passage": ', '{"passage": "hola"}'])
+    client = CachingAiClient(inner, name="test_invalid", ttl=60, variants=1, validate=json.loads)
+    client.cache = MemoryResponseCache()
+
+    assert client.ask_ai(MESSAGES) == '{"passage": '
+    assert client.ask_ai(MESSAGES) == '{"passage": "hola"}'
+    assert client.ask_ai(MESSAGES) == '{"passage": "hola"}'
+    assert inner.calls == 2
+
+
+def test_invalid_answers_are_not_cached_async():
+    inner = ScriptedClient(["not json", '{"passage": "hola"}'])
+    client = CachingAiClient(inner, name="test_invalid_async", ttl=60, variants=1, validate=json.loads)
+    client.cache = MemoryResponseCache()
+
+    assert asyncio.run(client.ask_ai_async(MESSAGES)) == "not json"
+    assert client.cache.get(client._fingerprint(MESSAGES)) == []
+    assert asyncio.run(client.ask_ai_async(MESSAGES)) == '{"passage": "hola"}'
+    assert asyncio.run(client.ask_ai_async(MESSAGES)) == '{"passage": "hola"}'
+    assert inner.calls == 2
+
+
+def test_invalid_streamed_answers_are_not_cached():
+    inner = ScriptedClient(["not json", "also not json", '{"passage": "hola"}'])
+    client = CachingAiClient(inner, name="test_invalid_stream", ttl=60, variants=1, validate=json.loads)
+    client.cache = MemoryResponseCache()
+
+    async def collect() -> str:
+        return "".join([chunk async for chunk in client.ask_ai_stream_async(MESSAGES)])
+
+    assert "".join(client.ask_ai_stream(MESSAGES)) == "not json"
+    assert asyncio.run(collect()) == "also not json"
+    assert client.cache.get(client._fingerprint(MESSAGES)) == []
+    assert "".join(client.ask_ai_stream(MESSAGES)) == '{"passage": "hola"}'
+    assert asyncio.run(collect()) == '{"passage": "hola"}'
+    assert inner.calls == 3
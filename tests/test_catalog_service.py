@@ -0,0 +1,84 @@
+import json
+import asyncio
+from sqlmodel import Session
+
+from db import database, DatabaseSettings
+from db.query_counter import count_queries
+from entity import Subject, SubjectTanslation
+from service import CacheService, Catalog, CatalogService, CourseService
+
+
+def test_catalog_indexes(engine):
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+    with Session(engine) as session:
+        with count_queries() as counter:
+            catalog = CatalogService(session=session).get_catalog()
+            assert CatalogService(session=session).get_catalog() is catalog
+        assert counter.count == CatalogService.LOAD_STATEMENTS
+
+        # detached copies, a commit in the request session doesn't expire them
+        session.commit()
+        assert catalog.subjects_by_code["es-MX"].id == 2
+        assert catalog.instruction_languages_by_code["en-US"].name == "English"
+        assert [level.name for level in catalog.levels_of_subject(2)] == ["Novice Low"]
+        assert catalog.tutors_by_id[1].gender == "F"
+
+        # the fields the endpoints have always returned, not whole entities
+        assert json.loads(catalog.encoded_section("tutors")) == [{"id": 1, "name": "Ana", "url": "", "description": "friendly"}]
+        assert json.loads(catalog.encoded_section("subjects")) == [{"id": 2, "name": "Spanish", "code": "es-MX", "category_id": 1}]
+        assert catalog.encoded_section("levels/99") == b"[]"
+
+        version = catalog.version
+        assert CatalogService(session=session)._load().version == version
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+
+
+def test_localized_catalog():
+    subjects = [Subject(id=2, name="Spanish", code="es-MX", description="es", category_id=1),
+                Subject(id=3, name="Japanese", code="ja-JP", description="ja", category_id=1)]
+    translations = [SubjectTanslation(subject_id=2, lang_code="zh", name="西班牙语", description="")]
+    catalog = Catalog(subjects, [], [], [], [], subject_translations=translations)
+
+    assert catalog.resolve_language(["fr", "zh-CN"]) == "zh"
+    assert catalog.resolve_language(["de"]) == ""
+    assert [s["name"] for s in json.loads(catalog.encoded_section("subjects", "zh"))] == ["西班牙语", "Japanese"]
+    assert catalog.localized_subjects["zh"][0].description == "es"   # falls back to the base text
+    assert catalog.encoded_section("tutors", "zh") == catalog.encoded_section("tutors")
+    assert catalog.subjects_by_id[2].name == "Spanish"
+
+
+def test_bootstrap(tmp_path, engine):
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+    database.init_async_db(DatabaseSettings(database_url=f"sqlite:///{tmp_path}/lingo.db"))
+
+    async def bootstrap(catalog_version: str | None = None) -> tuple[dict, int]:
+        sessions = database.get_async_session()
+        session = await anext(sessions)
+        with count_queries() as counter:
+            body = await CourseService(session=session).get_bootstrap_async(
+                CourseService.BootstrapRequest(user_uuid="u1", catalog_version=catalog_version))
+        await sessions.aclose()
+        return json.loads(body), counter.count
+
+    async def run():
+        try:
+            first = await bootstrap()
+            return first, await bootstrap(first[0]["catalog_version"])
+        finally:
+            await database.stop_db()
+
+    (first, cold_count), (current, warm_count) = asyncio.run(run())
+    # a cold catalog load plus the user's courses, then only the courses
+    assert (cold_count, warm_count) == (1 + CatalogService.LOAD_STATEMENTS, 1)
+
+    catalog = first["catalog"]
+    assert [subject["name"] for subject in catalog["subjects"]] == ["Spanish"]
+    assert [level["name"] for level in catalog["levels"]] == ["Novice Low"]
+    assert [tutor["name"] for tutor in catalog["tutors"]] == ["Ana"]
+    assert [lang["code"] for lang in catalog["instruction_languages"]] == ["en-US"]
+    assert catalog["topics"] == []
+    assert [(course["course_id"], course["tutor_id"]) for course in first["courses"]] == [(1, 1), (2, 1)]
+
+    # the client's catalog is current, only the courses are sent
+    assert current == {"catalog_version": first["catalog_version"], "catalog": None, "courses": first["courses"]}
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
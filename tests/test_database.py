@@ -0,0 +1,79 @@
+import asyncio
+from sqlmodel import Session, select
+
+from db import database, DatabaseSettings, RoutingSession, use_primary
+from db.routing import ReadYourWrites
+from db.engine_factory import to_async_url, create_db_engine, pool_stats
+from entity import Subject
+
+
+def test_to_async_url():
+    assert to_async_url("mysql+mysqlconnector://localhost:3306/lingoDB") == "mysql+aiomysql://localhost:3306/lingoDB"
+    assert to_async_url("sqlite:///./sqlite.db") == "sqlite+aiosqlite:///./sqlite.db"
+
+
+def test_pool_stats(tmp_path):
+    settings = DatabaseSettings(database_url=f"sqlite:///{tmp_path}/lingo.db", pool_size=2, max_overflow=0)
+    engine = create_db_engine(settings)
+    with Session(engine) as session:
+        session.connection()
+        stats = pool_stats(engine)
+        assert stats["size"] == 2
+        assert stats["checked_out"] == 1
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+
+    engine.dispose()
+    with Session(engine) as session:
+        session.connection()
+    assert pool_stats(engine)["checkouts"] == 2
+
+
+def test_async_session(tmp_path):
+    settings = DatabaseSettings(database_url=f"sqlite:///{tmp_path}/lingo.db")
+    database.start_db(database.init_db(settings))
+    database.init_async_db(settings)
+
+    async def run():
+        sessions = database.get_async_session()
+        session = await anext(sessions)
+        session.add(Subject(id=1, name="Spanish", code="es-MX", description="Spanish", category_id=1))
+        await session.commit()
+        subject = (await session.exec(select(Subject).where(Subject.code == "es-MX"))).first()
+        await sessions.aclose()
+        await database.stop_db()
+        return subject
+
+    subject = asyncio.run(run())
+    assert subject.name == "Spanish"
+
+
+def test_routing_session_reads_replica_until_write(tmp_path):
+    settings = DatabaseSettings(database_url=f"sqlite:///{tmp_path}/primary.db")
+    primary = create_db_engine(settings)
+    replica = create_db_engine(settings, f"sqlite:///{tmp_path}/replica.db")
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        database.start_db(engine)
+        with Session(engine) as session:
+            session.add(Subject(id=1, name=name, code="es-MX", description=name, category_id=1))
+            session.commit()
+
+    with RoutingSession(primary, info={"replica": replica}) as session:
+        assert session.exec(select(Subject.name)).first() == "replica"
+        session.add(Subject(id=2, name="Japanese", code="ja-JP", description="ja", category_id=1))
+        session.commit()
+        assert session.exec(select(Subject.name).where(Subject.id == 1)).first() == "primary"
+
+    with RoutingSession(primary, info={"replica": replica}) as session:
+        use_primary(session)
+        assert session.exec(select(Subject.name).where(Subject.id == 1)).first() == "primary"
+
+
+def test_read_your_writes_window():
+    tracker = ReadYourWrites(window_seconds=60)
+    assert not tracker.recently_wrote("u1")
+    tracker.record_write("u1")
+    assert tracker.recently_wrote("u1")
+    tracker.window_seconds = 0
+    assert not tracker.recently_wrote("u1")
@@ -0,0 +1,63 @@
+import asyncio
+
+from agent.client import CachingAiClient
+from service.exercise_pool import ExercisePool, InMemoryExerciseQueue
+
+PARAMS = {"topic": "food", "actfl_level": "Novice Mid", "target_language": "es-MX"}
+
+
+def test_popular_keys_are_refilled():
+    pool = ExercisePool(InMemoryExerciseQueue(), low_water=2, high_water=3, min_demand=2)
+    assert pool.take("listening", PARAMS) is None
+    assert asyncio.run(pool.refill()) == 0          # one request is not popular yet
+
+    assert pool.take("listening", PARAMS) is None
+    assert asyncio.run(pool.refill()) == 3
+    item = pool.take("listening", PARAMS)
+    assert item["passage"] and len(item["questions"]) == 3
+
+    assert asyncio.run(pool.refill()) == 0          # 2 left, not below low_water
+    pool.take("listening", PARAMS)
+    assert asyncio.run(pool.refill()) == 2          # topped up to high_water
+    assert (pool.hits, pool.misses, pool.generated) == (2, 2, 5)
+
+
+def test_demand_fades():
+    pool = ExercisePool(InMemoryExerciseQueue(), min_demand=2)
+    for _ in range(3):
+        pool.take("writing", {"topic": "travel"})
+    pool._decay()
+    assert pool._popular_keys() == []
+    pool._decay()
+    assert pool.stats()["keys"] == {}
+
+
+def test_refills_bypass_response_cache():
+    pool = ExercisePool(InMemoryExerciseQueue(), low_water=1, high_water=2, min_demand=1)
+    pool.take("listening", PARAMS)
+    before = CachingAiClient.stats_by_name().get("listening")
+    assert asyncio.run(pool.refill()) == 2
+    assert CachingAiClient.stats_by_name().get("listening") == before
+
+
+def test_workers_share_one_refill():
+    queue = InMemoryExerciseQueue()
+    workers = [ExercisePool(queue, low_water=2, high_water=3, min_demand=1) for _ in range(3)]
+    for pool in workers:
+        pool.take("listening", PARAMS)
+
+    async def refill_all():
+        return await asyncio.gather(*(pool.refill() for pool in workers))
+
+    assert sorted(asyncio.run(refill_all())) == [0, 0, 3]
+    assert queue.size(ExercisePool._key("listening", PARAMS)) == 3
+
+
+def test_faded_key_pool_is_cleared():
+    queue = InMemoryExerciseQueue()
+    pool = ExercisePool(queue, low_water=1, high_water=2, min_demand=1)
+    pool.take("listening", PARAMS)
+    assert asyncio.run(pool.refill()) == 2
+    pool._decay()
+    assert pool.stats()["keys"] == {}
+    assert queue.size(ExercisePool._key("listening", PARAMS)) == 0
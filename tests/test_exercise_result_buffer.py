@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from db import database, DatabaseSettings
+from entity import User, ExerciseSet, ExerciseResult
+from service.course_service import CourseService
+from service.exercise_result_buffer import ExerciseResultBuffer, InMemoryResultQueue
+
+
+def submission(exercise_set_id: int, scores: list[int]) -> CourseService.ExerciseResultRequest:
+    return CourseService.ExerciseResultRequest(user_uuid="u1", exercise_set_id=exercise_set_id, result=[
+        CourseService.QnAResult(id=i, question="q", answer="a", score=score) for i, score in enumerate(scores)])
+
+
+def create_test_engine(tmp_path):
+    engine = database.init_db(DatabaseSettings(database_url=f"sqlite:///{tmp_path}/lingo.db"))
+    database.start_db(engine)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.add(User(id=1, uuid="u1", create_date=now, update_date=now))
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=1, exercise_type="speaking"))
+        session.add(ExerciseSet(id=2, user_id=1, course_id=1, topic_id=1, exercise_type="writing"))
+        session.commit()
+    return engine
+
+
+def test_write_behind_flush(tmp_path):
+    engine = create_test_engine(tmp_path)
+    ExerciseResultBuffer._instance = ExerciseResultBuffer(InMemoryResultQueue(max_size=2), flush_size=10)
+    try:
+        with Session(engine) as session:
+            service = CourseService(session=session)
+            assert service.submit_exercise_result(submission(1, [1, 0])).correct_percentage == 0.5
+            assert len(session.exec(select(ExerciseResult)).all()) == 0
+            # the batch doesn't fit, none of it is queued or written
+            batch = CourseService.ExerciseResultBatchRequest(user_uuid="u1", exercise_sets=[
+                submission(1, [1, 1]).model_dump(), submission(2, [0]).model_dump()])
+            with pytest.raises(HTTPException) as error:
+                service.submit_exercise_results(batch)
+            assert error.value.status_code == 503
+            assert service.submit_exercise_result(submission(1, [1, 1, 1, 1])).correct_percentage == 1.0
+
+        assert ExerciseResultBuffer.instance().flush() == 2
+        with Session(engine) as session:
+            assert len(session.exec(select(ExerciseResult)).all()) == 6
+            exercise_set = session.get(ExerciseSet, 1)
+            assert (exercise_set.correct_percentage, exercise_set.exercise_count) == (1.0, 4)
+    finally:
+        ExerciseResultBuffer._instance = None
+        engine.dispose()
+
+
+def test_failed_item_keeps_its_place(tmp_path, monkeypatch):
+    engine = create_test_engine(tmp_path)
+    buffer = ExerciseResultBuffer(InMemoryResultQueue(max_size=10), flush_size=10)
+    write = ExerciseResultBuffer._write
+    failures = []
+
+    def fail_first_attempt(items):
+        # the older submission of set 1 fails once, e.g. on a lock timeout
+        if any(item["result"][0]["answer"] == "old" and item["attempts"] == 0 for item in items):
+            failures.append(len(items))
+            raise RuntimeError("lock wait timeout")
+        write(items)
+
+    monkeypatch.setattr(ExerciseResultBuffer, "_write", staticmethod(fail_first_attempt))
+    try:
+        old = [{"id": 0, "question": "q", "answer": "old", "score": 0}]
+        new = [{"id": 0, "question": "q", "answer": "new", "score": 1}]
+        assert buffer.offer("u1", [(1, old), (2, new)])
+        assert buffer.offer("u1", [(1, new)])
+
+        # set 2 is written, the newer submission of set 1 waits behind the failed one
+        assert buffer.flush() == 1
+        assert failures == [3, 1]
+        assert buffer.queue.size() == 2
+        assert buffer.flush() == 2
+        with Session(engine) as session:
+            exercise_set = session.get(ExerciseSet, 1)
+            assert (exercise_set.correct_percentage, exercise_set.exercise_count) == (1.0, 1)
+            answers = session.exec(select(ExerciseResult.answer).where(ExerciseResult.exercise_set_id == 1)
+                                   .order_by(ExerciseResult.id)).all()
+            assert answers == ["old", "new"]
+    finally:
+        engine.dispose()
+
+
+def test_failing_item_does_not_drop_batch(tmp_path):
+    engine = create_test_engine(tmp_path)
+
+    queue = InMemoryResultQueue(max_size=10)
+    buffer = ExerciseResultBuffer(queue, flush_size=10)
+    try:
+        good = submission(2, [1, 0]).model_dump()
+        buffer.offer("u1", [(2, good["result"])])
+        buffer.offer("u1", [(1, [{"id": 0, "question": "q", "answer": "a", "score": "not a score"}])])
+
+        assert buffer.flush() == 1
+        with Session(engine) as session:
+            assert len(session.exec(select(ExerciseResult)).all()) == 2
+        assert queue.size() == 1
+        # the bad item is retried until MAX_ATTEMPTS, then dropped
+        assert buffer.flush() == 0
+        assert buffer.flush() == 0
+        assert queue.size() == 0
+    finally:
+        engine.dispose()
@@ -0,0 +1,121 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+from langchain.schema import BaseMessage
+
+from agent.client import OpenAiClient, CircuitBreaker, CircuitOpenError, DeadlineExceededError, LlmClientSettings, init_llm_clients
+
+
+class MockOpenAi(BaseHTTPRequestHandler):
+    """
+    OpenAI-compatible /chat/completions answering with the queued status codes.
+    With trickle set, the answer is sent in small pieces trickle seconds apart.
+    """
+    statuses: list[int] = []
+    requests = 0
+    trickle = 0.0
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        MockOpenAi.requests += 1
+        status = MockOpenAi.statuses.pop(0) if MockOpenAi.statuses else 200
+        if status == 200 and request.get("stream"):
+            chunk = {"id": "1", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+                     "choices": [{"index": 0, "delta": {"content": "ho"}, "finish_reason": None}]}
+            pieces = [f"data: {json.dumps(chunk)}\n\n".encode()] * 20 + [b"data: [DONE]\n\n"]
+            content_type = "text/event-stream"
+        else:
+            body = {"error": {"message": "unavailable"}} if status != 200 else {
+                "id": "1", "object": "chat.completion", "created": 0, "model": "mock",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "hola"}}],
+            }
+            data = json.dumps(body).encode()
+            pieces = [data[i:i + 10] for i in range(0, len(data), 10)] if MockOpenAi.trickle else [data]
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(sum(len(piece) for piece in pieces)))
+        self.end_headers()
+        try:
+            for piece in pieces:
+                self.wfile.write(piece)
+                self.wfile.flush()
+                time.sleep(MockOpenAi.trickle)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    MockOpenAi.requests = 0
+    MockOpenAi.statuses = []
+    MockOpenAi.trickle = 0.0
+    init_llm_clients(LlmClientSettings(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1",
+                                       retry_base_delay=0.01, max_retries=2, breaker_failures=3, http2=False,
+                                       read_timeout=0.5, deadline=1.0))
+    yield MockOpenAi
+    server.shutdown()
+    init_llm_clients(LlmClientSettings.from_env())
+
+
+MESSAGES = [BaseMessage(content="tutor", type="system"), BaseMessage(content="hi", type="user")]
+
+
+def test_retries_5xx_and_429(mock_server):
+    mock_server.statuses = [503, 429]
+    assert OpenAiClient().ask_ai(MESSAGES) == "hola"
+    assert mock_server.requests == 3
+
+
+def test_circuit_opens_when_provider_fails(mock_server):
+    mock_server.statuses = [500] * 10
+    client = OpenAiClient()
+    for _ in range(3):
+        with pytest.raises(openai.InternalServerError):
+            client.ask_ai(MESSAGES)                 # 3 attempts, one breaker failure
+    with pytest.raises(CircuitOpenError):
+        client.ask_ai(MESSAGES)
+    assert mock_server.requests == 9
+
+
+def test_deadline_bounds_trickling_answers(mock_server):
+    # every piece arrives within the read timeout, the whole answer would take 3s
+    mock_server.trickle = 0.15
+    client = OpenAiClient()
+
+    async def stream_async():
+        return "".join([chunk async for chunk in client.ask_ai_stream_async(MESSAGES)])
+
+    for call in (lambda: client.ask_ai(MESSAGES), lambda: "".join(client.ask_ai_stream(MESSAGES)),
+                 lambda: asyncio.run(client.ask_ai_async(MESSAGES)), lambda: asyncio.run(stream_async())):
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            call()
+        assert time.monotonic() - started < 1.5
+
+
+def test_circuit_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10
+    breaker.before_call()                           # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()                       # one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
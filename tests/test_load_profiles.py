@@ -0,0 +1,238 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from db.load_profiles import load_profile, user_courses_statement, course_context_statement, exercise_history_statement
+from db.load_profiles import reusable_lessons_statement, exercise_set_content_statement
+from db.query_counter import count_queries
+from entity import User, UserCourse, ExerciseSet, ExerciseResult, Course, Tutor, LessonContent, Topic
+from agent.speaking_lesson_agent import SpeakingLessonAgent
+from db import database, DatabaseSettings
+from service import CacheService, CatalogService
+from service.course_service import CourseService
+from service.lesson_context_service import LessonContextService
+
+
+def test_user_courses_profile(engine):
+    with Session(engine) as session, count_queries() as counter:
+        user = session.exec(select(User).where(User.uuid == "u1").options(*load_profile("user_courses"))).first()
+        assert [uc.course.id for uc in user.courses] == [1, 2]
+    assert counter.count == 2
+
+
+def test_user_courses_statement(engine):
+    with Session(engine) as session, count_queries() as counter:
+        rows = session.exec(user_courses_statement("u1")).all()
+        assert [course.subject_id for uc, course in rows] == [2, 2]
+    assert counter.count == 1
+
+
+def test_course_context_statement(engine):
+    with Session(engine) as session, count_queries() as counter:
+        user, user_course, course = session.exec(course_context_statement("u1", 2)).first()
+        assert (user.id, user_course.tutor_id, course.id) == (1, 1, 2)
+        assert session.exec(course_context_statement("u1", 3)).first() is None
+    assert counter.count == 2
+
+
+def test_lesson_context_cached_until_course_changes(engine):
+    with Session(engine) as session:
+        session.add(Tutor(id=2, name="Luis", gender="M", url="", description="patient"))
+        session.add(Course(id=3, subject_id=2, subject_level_id=1))
+        session.commit()
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+    CacheService().clear(namespace=LessonContextService.CACHE_NAMESPACE)
+
+    with Session(engine) as session:
+        contexts = LessonContextService(session=session)
+        CatalogService(session=session).get_catalog()
+        with count_queries() as counter:
+            assert contexts.get_context("u1", 1).tutor.name == "Ana"
+            assert contexts.get_context("u1", 1).tutor.name == "Ana"
+            # unknown courses are looked up every time
+            assert contexts.get_context("u1", 3) is None
+            assert contexts.get_context("u1", 3) is None
+        assert counter.count == 3
+
+        service = CourseService(session=session)
+        service.update_user_course(CourseService.UserCourseData(user_uuid="u1", course_id=1, subject_id=2, level_id=1,
+                                                                tutor_id=2, instruction_language_id=1))
+        service.add_user_course(CourseService.UserCourseData(user_uuid="u1", course_id=3, subject_id=2, level_id=1,
+                                                             tutor_id=1, instruction_language_id=1))
+        with count_queries() as counter:
+            assert contexts.get_context("u1", 1).tutor.name == "Luis"
+            assert contexts.get_context("u1", 3).context.course_id == 3
+            assert contexts.get_context("u1", 3).tutor.name == "Ana"
+        assert counter.count == 2
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+
+
+def test_exercise_history_statement(engine):
+    same_time = datetime(2025, 1, 1, 12, 0)
+    with Session(engine) as session:
+        for set_id in range(1, 6):
+            session.add(ExerciseSet(id=set_id, user_id=1, course_id=1 + set_id % 2, topic_id=1,
+                                    exercise_type="speaking", create_date=same_time))
+        session.add(ExerciseSet(id=6, user_id=1, course_id=1, topic_id=1, exercise_type="writing",
+                                create_date=datetime(2024, 1, 1)))
+        session.commit()
+
+        pages, before = [], None
+        while True:
+            page = session.exec(exercise_history_statement("u1", 2, before=before)).all()
+            if not page:
+                break
+            pages.append([exercise_set.id for exercise_set in page])
+            before = (page[-1].create_date, page[-1].id)
+        assert pages == [[5, 4], [3, 2], [1, 6]]
+
+        page = session.exec(exercise_history_statement("u1", 10, course_id=1, exercise_type="speaking")).all()
+        assert [exercise_set.id for exercise_set in page] == [4, 2]
+
+
+def test_reusable_lessons_statement(engine):
+    key = dict(subject_id=2, subject_level_id=1, instruction_language_id=1, topic_id=1, exercise_count=10)
+    with Session(engine) as session:
+        session.add(LessonContent(id=1, content="a", use_count=3, **key))
+        session.add(LessonContent(id=2, content="b", use_count=1, **key))
+        session.add(LessonContent(id=3, content="c", use_count=1, **{**key, "topic_id": 2}))
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=1, exercise_type="speaking", lesson_content_id=2))
+        session.commit()
+
+    with Session(engine) as session, count_queries() as counter:
+        # lesson 2 was already served to user 1
+        assert [lesson.id for lesson in session.exec(reusable_lessons_statement(user_id=1, limit=5, **key)).all()] == [1]
+        assert [lesson.id for lesson in session.exec(reusable_lessons_statement(user_id=2, limit=5, **key)).all()] == [2, 1]
+        exercise_set, lesson = session.exec(exercise_set_content_statement(1, 1)).first()
+        assert (exercise_set.id, lesson.content) == (1, "b")
+        assert session.exec(exercise_set_content_statement(2, 1)).first() is None
+    assert counter.count == 4
+
+
+def exercise_history(tmp_path) -> CourseService.ExerciseHistoryPage:
+    database.init_async_db(DatabaseSettings(database_url=f"sqlite:///{tmp_path}/lingo.db"))
+
+    async def run():
+        sessions = database.get_async_session()
+        session = await anext(sessions)
+        page = await CourseService(session=session).get_exercise_history_async(
+            CourseService.ExerciseHistoryRequest(user_uuid="u1"))
+        await sessions.aclose()
+        await database.stop_db()
+        return page
+
+    return asyncio.run(run())
+
+
+def test_exercise_history_without_topic(tmp_path, engine):
+    with Session(engine) as session:
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=None, exercise_type="speaking"))
+        session.commit()
+
+    page = exercise_history(tmp_path)
+    assert [(item.exercise_set_id, item.topic_id) for item in page.items] == [(1, None)]
+
+
+def test_exercise_history_latest_submission(tmp_path, engine):
+    # a resubmission within the same second, DATETIME columns can't tell them apart
+    same_time = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=1, exercise_type="writing", exercise_count=2))
+        session.commit()
+        for index, answer in [(1, "old"), (2, "old"), (3, "old"), (1, "new"), (2, "new")]:
+            session.add(ExerciseResult(exercise_set_id=1, index=index, question="q", answer=answer, score=1,
+                                       create_date=same_time))
+        session.commit()
+
+    [item] = exercise_history(tmp_path).items
+    assert [(result.id, result.answer) for result in item.result] == [(1, "new"), (2, "new")]
+
+
+def speaking_lesson(engine, user_uuid: str = "u1", exercise_set_id: int | None = None) -> tuple[dict, str]:
+    with Session(engine) as session:
+        stream = CourseService(session=session).get_speaking_lesson(CourseService.SpeakingLessonRequest(
+            user_uuid=user_uuid, course_id=1, instruction_language_id=1, topic_id=1, lesson_type="speaking",
+            exercise_set_id=exercise_set_id))
+
+    async def read():
+        return [chunk async for chunk in stream]
+
+    header, *chunks = asyncio.run(read()) if hasattr(stream, "__anext__") else list(stream)
+    return json.loads(header), "".join(chunks)
+
+
+def add_lesson_data(engine, monkeypatch):
+    with Session(engine) as session:
+        session.add(Topic(id=1, name="Weather", topic_category_id=1, subject_category_id=1))
+        session.add(User(id=2, uuid="u2", create_date=datetime.now(timezone.utc), update_date=datetime.now(timezone.utc)))
+        session.add(UserCourse(user_id=2, course_id=1, tutor_id=1, instruction_language_id=1))
+        session.commit()
+    monkeypatch.setattr(database, "engine", engine)
+    CacheService().invalidate(CatalogService.CACHE_KEY, namespace=CatalogService.CACHE_NAMESPACE)
+    CacheService().clear(namespace=LessonContextService.CACHE_NAMESPACE)
+
+
+def test_speaking_lesson_stored_and_replayed(engine, monkeypatch):
+    add_lesson_data(engine, monkeypatch)
+    monkeypatch.setenv("LESSON_REUSE_RATIO", "1")
+
+    header, generated = speaking_lesson(engine)
+    assert header == {"exercise_set_id": 1, "count": 10}
+    with Session(engine) as session:
+        [lesson] = session.exec(select(LessonContent)).all()
+        assert lesson.content == generated
+        assert session.get(ExerciseSet, 1).lesson_content_id == lesson.id
+
+    # another user's new set reuses the stored lesson, resuming a set replays its own
+    assert speaking_lesson(engine, "u2") == ({"exercise_set_id": 2, "count": 10}, generated)
+    assert speaking_lesson(engine, exercise_set_id=1) == ({"exercise_set_id": 1, "count": 10}, generated)
+    with Session(engine) as session:
+        assert session.get(ExerciseSet, 2).lesson_content_id == lesson.id
+        assert session.get(LessonContent, lesson.id).use_count == 2
+
+        session.add(ExerciseSet(id=3, user_id=1, course_id=1, topic_id=1, exercise_type="writing"))
+        session.commit()
+    with pytest.raises(HTTPException) as error:
+        speaking_lesson(engine, exercise_set_id=3)
+    assert error.value.status_code == 400
+
+
+def test_incomplete_speaking_lesson_not_stored(engine, monkeypatch):
+    add_lesson_data(engine, monkeypatch)
+    monkeypatch.setenv("LESSON_REUSE_RATIO", "0")
+
+    async def truncated(self, question):
+        yield "1.\nEl\tɛl\tclima\tˈklima\n"
+
+    monkeypatch.setattr(SpeakingLessonAgent, "ask_ai_stream_async", truncated)
+    header, content = speaking_lesson(engine)
+    assert (header["exercise_set_id"], content) == (1, "1.\nEl\tɛl\tclima\tˈklima\n")
+    with Session(engine) as session:
+        assert session.exec(select(LessonContent)).all() == []
+        assert session.get(ExerciseSet, 1).lesson_content_id is None
+
+
+def test_speaking_lesson_releases_connection_before_streaming(engine, monkeypatch):
+    add_lesson_data(engine, monkeypatch)
+    monkeypatch.setenv("LESSON_REUSE_RATIO", "0")
+    checked_out = []
+
+    async def stream(self, question):
+        checked_out.append(engine.pool.checkedout())
+        yield "1.\n"
+
+    monkeypatch.setattr(SpeakingLessonAgent, "ask_ai_stream_async", stream)
+    with Session(engine) as session:
+        lesson = CourseService(session=session).get_speaking_lesson(CourseService.SpeakingLessonRequest(
+            user_uuid="u1", course_id=1, instruction_language_id=1, topic_id=1, lesson_type="speaking"))
+        # the exercise set is committed and the connection is back in the pool before the LLM is asked
+        assert engine.pool.checkedout() == 0
+
+        async def read():
+            return [chunk async for chunk in lesson]
+
+        assert asyncio.run(read())[1:] == ["1.\n"]
+    assert checked_out == [0]
@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import VoiceTutorAgent, BaseTutorAgent
+from agent.client.stub_client import AUDI_EXAMPLE_1
+from service import TutorSessionStore, TutoringService
+
+
+def test_turns_and_tallies_update_in_place():
+    store = TutorSessionStore(backend="memory")
+    store.delete("u1", 1)
+
+    assert store.load("u1", 1).consecutive_errors == 0
+    store.record_turn("u1", 1, "correction")
+    state = store.record_turn("u1", 1, "explanation")
+    assert state.consecutive_errors == 2
+    assert store.record_turn("u1", 1, "nextQuestion").consecutive_errors == 0
+
+    state = store.record_weakness("u1", 1, grammar=["ser_estar"], vocab=["agua", "agua"], confidence=0.4)
+    assert [item for item, _ in state.weak_grammar.top(3)] == ["ser_estar"]
+    assert round(state.weak_vocab.top(1)[0][1]) == 2
+    assert state.last_confidence == 0.4
+    assert state.consecutive_errors == 0
+    assert store.load("u1", 2).weak_vocab.top(3) == []   # scoped per course
+
+
+def test_concurrent_turns_are_not_lost():
+    store = TutorSessionStore(backend="memory")
+    store.delete("u2", 1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: store.record_turn("u2", 1, "correction"), range(50)))
+    assert store.load("u2", 1).consecutive_errors == 50
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: store.record_weakness("u2", 1, vocab=["agua"]), range(20)))
+    assert round(store.load("u2", 1).weak_vocab.top(1)[0][1]) == 20
+
+
+def test_sliding_expiry():
+    store = TutorSessionStore(backend="memory", ttl=0.05)
+    store.delete("u3", 1)
+    store.record_turn("u3", 1, "correction")
+    time.sleep(0.03)
+    store.load("u3", 1)   # a read keeps the session alive
+    time.sleep(0.03)
+    assert store.load("u3", 1).consecutive_errors == 1
+    time.sleep(0.06)
+    assert store.load("u3", 1).consecutive_errors == 0
+
+
+def test_voice_answer_updates_tallies(monkeypatch):
+    monkeypatch.setenv("SESSION_STORE_BACKEND", "memory")
+    service = TutoringService(session=None)
+    service.session_store.delete("u4", 1)
+    request = TutoringService.AskTutorRequest(user_uuid="u4", course_id=1, text_1="", text_2="aqua", mode="correction")
+
+    service._record_weakness(request, TutoringService.AiResponse.model_validate_json(AUDI_EXAMPLE_1))
+    state = service.session_store.load("u4", 1)
+    assert [item for item, _ in state.weak_vocab.top(3)] == ["agua"]
+    assert state.last_confidence == 0.6
+
+
+def test_voice_prompt_does_not_anchor_weaknesses():
+    agent = VoiceTutorAgent(subject=SimpleNamespace(code="es-MX", name="Spanish"), level=SimpleNamespace(name="Novice Low"),
+                            tutor=SimpleNamespace(description="friendly"), inst_lang=SimpleNamespace(name="English", code="en-US"),
+                            mode="correction", session_state=BaseTutorAgent.TutorSessionState(user_uuid="u5", course_id=1))
+    assert '"weak_grammar":[],"weak_vocab":[],"confidence":<0 to 1>' in agent.system_message.content
@@ -0,0 +1,30 @@
+from utils import TopKSketch
+
+
+def test_keeps_frequent_items_within_k():
+    sketch = TopKSketch(k=3, updated_at=0)
+    for item in ["ser_estar"] * 5 + ["por_para"] * 3 + ["a", "b"]:
+        sketch.add(item, now=0)
+
+    assert len(sketch.slots) == 3
+    assert [item for item, _ in sketch.top(2, now=0)] == ["ser_estar", "por_para"]
+
+
+def test_fixed_size_round_trip():
+    sketch = TopKSketch(k=4, updated_at=0)
+    assert len(sketch.to_bytes()) == TopKSketch.size(4)
+    sketch.add("subjuntivo", now=0)
+    sketch.add("x" * 100, now=0)
+    data = sketch.to_bytes()
+    assert len(data) == TopKSketch.size(4)
+
+    copy = TopKSketch.from_bytes(data)
+    assert copy.top(4, now=0) == sketch.top(4, now=0)
+    assert "x" * TopKSketch.LABEL_BYTES in copy.slots
+
+
+def test_counts_decay():
+    sketch = TopKSketch(k=4, half_life=10, updated_at=0)
+    sketch.add("agua", weight=4, now=0)
+    assert sketch.top(1, now=20) == [("agua", 1.0)]
+    assert sketch.top(1, now=40) == []
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import mysql
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from entity import User, ExerciseSet, ExerciseResult, UserTopic
+from service.course_service import CourseService
+
+
+def submission(exercise_set_id: int, scores: list[int]) -> CourseService.ExerciseResultRequest:
+    return CourseService.ExerciseResultRequest(user_uuid="u1", exercise_set_id=exercise_set_id, result=[
+        CourseService.QnAResult(id=i, question="q", answer="a", score=score) for i, score in enumerate(scores)])
+
+
+def test_progress_rollup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/lingo.db")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.add(User(id=1, uuid="u1", create_date=now, update_date=now))
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=1, exercise_type="speaking"))
+        session.add(ExerciseSet(id=2, user_id=1, course_id=1, topic_id=1, exercise_type="writing"))
+        session.add(ExerciseSet(id=3, user_id=1, course_id=1, topic_id=2, exercise_type="writing"))
+        session.commit()
+
+    with Session(engine) as session:
+        service = CourseService(session=session)
+        service.submit_exercise_result(submission(1, [1, 0]))
+        # resubmitting a set replaces its previous answers in the rollup
+        service.submit_exercise_result(submission(1, [1, 1, 1, 0]))
+        service.submit_exercise_result(submission(2, [1, 1]))
+        service.submit_exercise_result(submission(3, [0, 0]))
+
+        [course] = service.get_user_progress("u1")
+        assert (course.course_id, course.set_count, course.exercise_count, course.correct_percentage) == (1, 3, 8, 0.625)
+        assert [(t.topic_id, t.set_count, t.exercise_count, t.correct_percentage) for t in course.topics] == [
+            (1, 2, 6, 5 / 6), (2, 1, 2, 0.0)]
+
+
+def test_batch_submission(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/lingo.db")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.add(User(id=1, uuid="u1", create_date=now, update_date=now))
+        session.add(ExerciseSet(id=1, user_id=1, course_id=1, topic_id=1, exercise_type="writing"))
+        session.add(ExerciseSet(id=2, user_id=1, course_id=1, topic_id=2, exercise_type="listening"))
+        session.commit()
+
+    with Session(engine) as session:
+        service = CourseService(session=session)
+        batch = CourseService.ExerciseResultBatchRequest(user_uuid="u1", exercise_sets=[
+            submission(1, [1, 0]).model_dump(), submission(2, [1, 1, 1]).model_dump()])
+        assert [(r.exercise_set_id, r.correct_percentage) for r in service.submit_exercise_results(batch)] == [(1, 0.5), (2, 1.0)]
+
+        duplicate = CourseService.ExerciseResultBatchRequest(user_uuid="u1", exercise_sets=[
+            submission(1, [1]).model_dump(), submission(1, [0]).model_dump()])
+        with pytest.raises(HTTPException) as error:
+            service.submit_exercise_results(duplicate)
+        assert error.value.status_code == 400
+
+        assert len(session.exec(select(ExerciseResult)).all()) == 5
+        [course] = service.get_user_progress("u1")
+        assert [(t.topic_id, t.set_count, t.exercise_count) for t in course.topics] == [(1, 1, 2), (2, 1, 3)]
+
+
+def test_rollup_upsert_adds_to_existing_row(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/lingo.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # another request created the rollup after this one computed its deltas
+        session.add(UserTopic(user_id=1, course_id=1, topic_id=1, set_count=1, exercise_count=2, score_total=1))
+        session.commit()
+
+    with Session(engine) as session:
+        CourseService(session=session)._apply_progress_deltas({(1, 1, 1): [1, 4, 4], (1, 1, 2): [1, 2, 0]})
+        session.commit()
+
+    with Session(engine) as session:
+        rollups = session.exec(select(UserTopic).order_by(UserTopic.topic_id)).all()
+        assert [(r.topic_id, r.set_count, r.exercise_count, r.score_total, r.correct_percentage, r.is_active)
+                for r in rollups] == [(1, 2, 6, 5, 5 / 6, True), (2, 1, 2, 0, 0.0, True)]
+
+
+def test_rollup_upsert_mysql_statement():
+    stmt = CourseService._upsert_rollups("mysql", [{"user_id": 1, "course_id": 1, "topic_id": 1, "set_count": 1,
+                                                     "exercise_count": 2, "score_total": 1, "correct_percentage": 0.5}])
+    sql = str(stmt.compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE correct_percentage = " in sql
+    assert sql.index("correct_percentage = ") < sql.index("score_total = ")
@@ -1 +1,5 @@
-from .app_logging import get_app_logger
\ No newline at end of file
+from .app_logging import get_app_logger
+from .http_cache import cached_json_response, etag_matches
+from .language import preferred_languages
+from .redis_client import RedisSettings, init_redis, get_redis, get_async_redis, close_redis
+from .top_k_sketch import TopKSketch
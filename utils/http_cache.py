@@ -0,0 +1,29 @@
+import os
+from fastapi import Request, Response
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    If-None-Match check, weak comparison as RFC 9110 asks for GET/HEAD.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, max_age: int | None = None,
+                         headers: dict | None = None) -> Response:
+    """
+    Response for pre-encoded JSON that changes rarely: 304 when the client
+    already has this ETag, the body otherwise. max_age defaults to HTTP_CACHE_MAX_AGE.
+    """
+    if max_age is None:
+        max_age = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,24 @@
+from fastapi import Request
+
+
+def preferred_languages(request: Request, lang: str | None = None) -> list[str]:
+    """
+    Language tags the client asked for, best first: an explicit lang parameter,
+    then Accept-Language ordered by q value.
+    """
+    languages = [lang] if lang else []
+    weighted = []
+    for position, part in enumerate(request.headers.get("accept-language", "").split(",")):
+        tag, _, params = part.strip().partition(";")
+        if not tag or tag == "*":
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if q > 0:
+            weighted.append((-q, position, tag.strip()))
+    languages.extend(tag for _, _, tag in sorted(weighted))
+    return languages
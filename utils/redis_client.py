@@ -0,0 +1,73 @@
+import os
+import redis
+import redis.asyncio as aioredis
+from pydantic import BaseModel
+
+from .app_logging import get_app_logger
+
+logger = get_app_logger(__name__)
+
+
+class RedisSettings(BaseModel):
+    host: str = "localhost"
+    port: int = 6379
+    db: int = 0
+    password: str | None = None
+    max_connections: int = 50
+    socket_timeout: float = 2.0             # seconds per command
+    socket_connect_timeout: float = 2.0
+    health_check_interval: int = 30         # PING connections idle longer than this before use
+
+    @classmethod
+    def from_env(cls) -> "RedisSettings":
+        defaults = cls()
+        return cls(
+            host=os.getenv("REDIS_HOST", defaults.host),
+            port=int(os.getenv("REDIS_PORT", defaults.port)),
+            db=int(os.getenv("REDIS_DB", defaults.db)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", defaults.max_connections)),
+            socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", defaults.socket_timeout)),
+            socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", defaults.socket_connect_timeout)),
+            health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", defaults.health_check_interval)),
+        )
+
+
+_pool: redis.ConnectionPool | None = None
+_async_pool: aioredis.ConnectionPool | None = None
+
+
+def init_redis(settings: RedisSettings):
+    """
+    Creates the process-wide connection pools. The asyncio pool belongs to the
+    running event loop, call this from main.lifespan.
+    """
+    global _pool, _async_pool
+    kwargs = settings.model_dump()
+    _pool = redis.ConnectionPool(**kwargs)
+    _async_pool = aioredis.ConnectionPool(**kwargs)
+    logger.info(f"redis pool {settings.host}:{settings.port}/{settings.db}, max {settings.max_connections} connections")
+
+
+def get_redis() -> redis.Redis:
+    """
+    Client on the shared pool, cheap to create per call.
+    """
+    if _pool is None:
+        init_redis(RedisSettings.from_env())
+    return redis.Redis(connection_pool=_pool)
+
+
+def get_async_redis() -> aioredis.Redis:
+    if _async_pool is None:
+        init_redis(RedisSettings.from_env())
+    return aioredis.Redis(connection_pool=_async_pool)
+
+
+async def close_redis():
+    global _pool, _async_pool
+    if _async_pool is not None:
+        await _async_pool.disconnect()
+    if _pool is not None:
+        _pool.disconnect()
+    _pool = _async_pool = None
@@ -0,0 +1,89 @@
+import math
+import time
+import struct
+
+
+class TopKSketch:
+    """
+    Space-Saving top-k counter with exponential decay. Keeps at most k items,
+    an unseen item replaces the smallest one and inherits its count as error,
+    so frequent items survive while the long tail is forgotten. Counts halve
+    every half_life seconds, old weaknesses fade out once they stop recurring.
+
+    to_bytes() always returns size(k) bytes whatever the number of items,
+    labels are cut to LABEL_BYTES of UTF-8.
+    """
+    LABEL_BYTES = 32
+    _HEADER = struct.Struct("<Hdf")                 # k, updated_at, half_life
+    _SLOT = struct.Struct(f"<ff{LABEL_BYTES}s")      # count, error, label
+
+    def __init__(self, k: int = 16, half_life: float = 14 * 24 * 3600, updated_at: float | None = None):
+        self.k = k
+        self.half_life = half_life
+        self.updated_at = updated_at if updated_at is not None else time.time()
+        # label -> [count, error]
+        self.slots: dict[str, list[float]] = {}
+
+
+    @staticmethod
+    def size(k: int) -> int:
+        return TopKSketch._HEADER.size + k * TopKSketch._SLOT.size
+
+
+    def add(self, item: str, weight: float = 1.0, now: float | None = None):
+        self._decay(now)
+        item = TopKSketch._label(item)
+        slot = self.slots.get(item)
+        if slot is not None:
+            slot[0] += weight
+        elif len(self.slots) < self.k:
+            self.slots[item] = [weight, 0.0]
+        else:
+            smallest = min(self.slots, key=lambda label: self.slots[label][0])
+            count = self.slots.pop(smallest)[0]
+            self.slots[item] = [count + weight, count]
+
+
+    def top(self, n: int, min_count: float = 0.5, now: float | None = None) -> list[tuple[str, float]]:
+        """
+        Up to n (item, count) pairs by decayed count, skipping items below min_count.
+        """
+        self._decay(now)
+        ranked = sorted(self.slots.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [(label, count) for label, (count, _) in ranked[:n] if count >= min_count]
+
+
+    def to_bytes(self) -> bytes:
+        parts = [TopKSketch._HEADER.pack(self.k, self.updated_at, self.half_life)]
+        for label, (count, error) in self.slots.items():
+            parts.append(TopKSketch._SLOT.pack(count, error, label.encode()))
+        parts.append(bytes(TopKSketch._SLOT.size * (self.k - len(self.slots))))
+        return b"".join(parts)
+
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TopKSketch":
+        k, updated_at, half_life = cls._HEADER.unpack_from(data)
+        sketch = cls(k=k, half_life=half_life, updated_at=updated_at)
+        for offset in range(cls._HEADER.size, len(data), cls._SLOT.size):
+            count, error, label = cls._SLOT.unpack_from(data, offset)
+            if count > 0:
+                sketch.slots[label.rstrip(b"\0").decode()] = [count, error]
+        return sketch
+
+
+    def _decay(self, now: float | None):
+        now = now if now is not None else time.time()
+        elapsed = now - self.updated_at
+        if elapsed > 0 and self.half_life > 0:
+            factor = math.pow(0.5, elapsed / self.half_life)
+            for slot in self.slots.values():
+                slot[0] *= factor
+                slot[1] *= factor
+        self.updated_at = max(now, self.updated_at)
+
+
+    @staticmethod
+    def _label(item: str) -> str:
+        # cut on a character boundary so the stored bytes decode
+        return item.encode()[:TopKSketch.LABEL_BYTES].decode(errors="ignore")